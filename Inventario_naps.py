@@ -1,33 +1,23 @@
 import pandas as pd 
+import numpy as np
 import logging
+import io
 import psycopg2
-import json
 import time
 import os
+import sys
 from functools import lru_cache
+from base_datos import conexion_bd
+from lector_excel import leer_hoja, RUTA_DATA
+from exportadores import crear_escritor
+import snapshot_naps
+import cache_regiones
+import manifiesto_naps
+import indice_espacial
+import metricas
 
-#configuracion logging
-logging.basicConfig(level=logging.DEBUG)
-
-def conexion_bd():
-    try:
-        with open("configuracion/conexion.json", "r") as archivo:
-            credenciales = json.load(archivo)
-        
-        conn = psycopg2.connect(
-            dbname=credenciales["PostgresSQL"]["database"],
-            user=credenciales["PostgresSQL"]["user"],
-            password=credenciales["PostgresSQL"]["password"],
-            host=credenciales["PostgresSQL"]["host"],
-            port=credenciales["PostgresSQL"]["port"]
-        )
-        
-        if conn is not None:
-            logging.info("Conexión exitosa a la base de datos")
-            return conn
-    except Exception as e:
-        logging.error(f"Error al conectar a la base de datos: {e}")
-        return None
+# Carpeta donde se generan los archivos de NAPs faltantes
+DIR_REGISTROS = "Registros_Naps"
 
 def get_column_case_insensitive(df, column_name):
     """Obtiene una columna del DataFrame independientemente de mayúsculas/minúsculas"""
@@ -36,17 +26,25 @@ def get_column_case_insensitive(df, column_name):
             return col
     return None
 
-def lectura_naps():
+# Columnas de la hoja Naps y su nombre/tipo en la tabla normalizada
+COLUMNAS_TEXTO = {"HUB": "hub", "CLUSTER": "cluster", "OLT": "olt"}
+COLUMNAS_ENTERAS = {"FRAME": "frame", "SLOT": "slot", "PUERTO": "puerto", "# PUERTOS NAP": "puertos_nap"}
+COLUMNAS_DECIMALES = {"LATITUD": "latitud", "LONGITUD": "longitud"}
+COLUMNAS_NAP = ["codigo_nap", "hub", "cluster", "olt", "frame", "slot", "puerto",
+                "puertos_nap", "latitud", "longitud"]
+
+def lectura_naps_tabla(ruta=RUTA_DATA):
+    """Lee la hoja 'Naps' y la normaliza con operaciones por columna.
+    Retorna un DataFrame con las columnas de COLUMNAS_NAP ya tipadas, o None si hay errores."""
     try:
-        df = pd.read_excel("Data/data.xlsx", sheet_name="Naps")
+        df = leer_hoja("Naps", ruta)
 
         # Mostrar las columnas disponibles para depuración
         logging.info(f"Columnas disponibles en el Excel: {list(df.columns)}")
         
         # Mapeo de nombres de columnas esperadas a nombres reales
         column_mappings = {}
-        expected_columns = ["CODIGO_NAP", "HUB", "CLUSTER", "OLT", "FRAME", "SLOT", 
-                            "PUERTO", "# PUERTOS NAP", "LATITUD", "LONGITUD"]
+        expected_columns = ["CODIGO_NAP", *COLUMNAS_TEXTO, *COLUMNAS_ENTERAS, *COLUMNAS_DECIMALES]
         
         for col in expected_columns:
             actual_col = get_column_case_insensitive(df, col)
@@ -60,82 +58,41 @@ def lectura_naps():
             return None
             
         try:
-            # Extraer columnas
-            codigo_nap_col = column_mappings.get("CODIGO_NAP")
-            hub_col = column_mappings.get("HUB")
-            cluster_col = column_mappings.get("CLUSTER")
-            olt_col = column_mappings.get("OLT")
-            frame_col = column_mappings.get("FRAME")
-            slot_col = column_mappings.get("SLOT")
-            puerto_col = column_mappings.get("PUERTO")
-            puertos_nap_col = column_mappings.get("# PUERTOS NAP")
-            latitud_col = column_mappings.get("LATITUD")
-            longitud_col = column_mappings.get("LONGITUD")
-            
             # Verificar que existe la columna de código NAP
+            codigo_nap_col = column_mappings.get("CODIGO_NAP")
             if not codigo_nap_col:
                 logging.error("No se encontró la columna de códigos NAP")
                 return None
-                
-            # Extraer todos los NAPs con sus datos correspondientes
-            nap_data = []
-            for idx, row in df.iterrows():
-                if pd.notna(row[codigo_nap_col]):
-                    nap_code = row[codigo_nap_col]
-                    
-                    # Extraer datos generales (usar el valor de la fila actual o valor predeterminado)
-                    hub = row[hub_col] if hub_col and pd.notna(row[hub_col]) else "Sin dato"
-                    cluster = row[cluster_col] if cluster_col and pd.notna(row[cluster_col]) else "Sin dato"
-                    olt = row[olt_col] if olt_col and pd.notna(row[olt_col]) else "Sin dato"
-                    frame = int(row[frame_col]) if frame_col and pd.notna(row[frame_col]) else 0
-                    slot = int(row[slot_col]) if slot_col and pd.notna(row[slot_col]) else 0
-                    puerto = int(row[puerto_col]) if puerto_col and pd.notna(row[puerto_col]) else 0
-                    puertos_nap = int(row[puertos_nap_col]) if puertos_nap_col and pd.notna(row[puertos_nap_col]) else 0
-                    
-                    # Extraer coordenadas de la fila actual
-                    latitud = float(row[latitud_col]) if latitud_col and pd.notna(row[latitud_col]) else 0.0
-                    longitud = float(row[longitud_col]) if longitud_col and pd.notna(row[longitud_col]) else 0.0
-                    
-                    # Guardar todos los datos relacionados con este NAP
-                    nap_data.append({
-                        "codigo_nap": nap_code,
-                        "hub": hub,
-                        "cluster": cluster,
-                        "olt": olt,
-                        "frame": frame,
-                        "slot": slot,
-                        "puerto": puerto,
-                        "puertos_nap": puertos_nap,
-                        "latitud": latitud,
-                        "longitud": longitud
-                    })
-            
-            if not nap_data:
+
+            # Descartar filas sin código NAP
+            df = df[df[codigo_nap_col].notna()]
+            if df.empty:
                 logging.error("No se encontraron códigos NAP válidos en el Excel")
                 return None
-                
-            # Extraer códigos NAP para mantener compatibilidad
-            codigos_nap = [item["codigo_nap"] for item in nap_data]
-            
-            # Para mantener compatibilidad con el código existente, usamos los valores del primer NAP
-            # pero guardamos todos los datos para acceder a coordenadas individuales más adelante
-            first_nap = nap_data[0]
-            hub = first_nap["hub"]
-            cluster = first_nap["cluster"]
-            olt = first_nap["olt"]
-            frame = first_nap["frame"]
-            slot = first_nap["slot"]
-            puerto = first_nap["puerto"]
-            puertos_nap = first_nap["puertos_nap"]
-            latitud = first_nap["latitud"]
-            longitud = first_nap["longitud"]
-            
+
+            # Construir la tabla columna por columna (valores por defecto para celdas vacías o columnas ausentes)
+            with metricas.etapa("normalizar_naps", metricas.TRANSFORMACION, filas=len(df)):
+                tabla = {"codigo_nap": df[codigo_nap_col].to_numpy(dtype=object)}
+                for col, destino in COLUMNAS_TEXTO.items():
+                    origen = column_mappings.get(col)
+                    tabla[destino] = (df[origen].astype(object).where(df[origen].notna(), "Sin dato").to_numpy()
+                                      if origen else "Sin dato")
+                for col, destino in COLUMNAS_ENTERAS.items():
+                    origen = column_mappings.get(col)
+                    tabla[destino] = (pd.to_numeric(df[origen]).fillna(0).astype("int64").to_numpy()
+                                      if origen else 0)
+                for col, destino in COLUMNAS_DECIMALES.items():
+                    origen = column_mappings.get(col)
+                    tabla[destino] = (pd.to_numeric(df[origen]).fillna(0.0).astype("float64").to_numpy()
+                                      if origen else 0.0)
+                tabla = pd.DataFrame(tabla, columns=COLUMNAS_NAP)
+
             # Logging para depuración
-            logging.debug(f"Se encontraron {len(nap_data)} NAPs en el Excel")
-            logging.debug(f"Primer NAP - hub: {hub}, cluster: {cluster}, olt: {olt}, frame: {frame}, slot: {slot}, puerto: {puerto}")
-            
-            # Agregar nap_data como elemento adicional al retorno para usar en busqueda_naps_bd
-            return hub, cluster, olt, frame, slot, puerto, codigos_nap, puertos_nap, latitud, longitud, nap_data
+            primero = tabla.iloc[0]
+            logging.debug(f"Se encontraron {len(tabla)} NAPs en el Excel")
+            logging.debug(f"Primer NAP - hub: {primero['hub']}, cluster: {primero['cluster']}, olt: {primero['olt']}, "
+                          f"frame: {primero['frame']}, slot: {primero['slot']}, puerto: {primero['puerto']}")
+            return tabla
         except Exception as e:
             logging.error(f"Error al extraer datos del Excel: {e}")
             return None
@@ -147,10 +104,23 @@ def lectura_naps():
         logging.error(f"Error inesperado al procesar el Excel: {e}")
         return None
 
-def get_region_zone_from_excel():
+def lectura_naps(ruta=RUTA_DATA):
+    """Versión compatible de la lectura: retorna la tupla de 11 elementos con la lista de diccionarios nap_data"""
+    tabla = lectura_naps_tabla(ruta)
+    if tabla is None:
+        return None
+    nap_data = tabla.to_dict("records")
+    codigos_nap = tabla["codigo_nap"].tolist()
+    # Para mantener compatibilidad con el código existente, usamos los valores del primer NAP
+    first_nap = nap_data[0]
+    return (first_nap["hub"], first_nap["cluster"], first_nap["olt"], first_nap["frame"],
+            first_nap["slot"], first_nap["puerto"], codigos_nap, first_nap["puertos_nap"],
+            first_nap["latitud"], first_nap["longitud"], nap_data)
+
+def get_region_zone_from_excel(ruta=RUTA_DATA):
     """Obtiene la región y zona desde el archivo Excel en la hoja 'Liberacion'"""
     try:
-        df = pd.read_excel("Data/data.xlsx", sheet_name="Liberacion")
+        df = leer_hoja("Liberacion", ruta)
         
         # Mostrar las columnas disponibles para depuración
         logging.info(f"Columnas disponibles en la hoja Liberacion: {list(df.columns)}")
@@ -181,110 +151,220 @@ def get_region_zone_from_excel():
         logging.error(f"Error al leer región y zona del Excel: {e}")
         return "Sin dato", "Sin dato"
 
-# Caché para evitar consultas repetidas a la base de datos
-@lru_cache(maxsize=128)
-def get_region_zone_from_db(cluster):
-    """Obtiene la región y zona desde la base de datos según el cluster"""
+def region_por_nombre_cluster(cluster, region):
+    """Deduce la región a partir del código del cluster cuando no hay datos en la BD"""
+    if "R1" in str(cluster).upper():
+        return "R1"
+    if "R2" in str(cluster).upper():
+        return "R2"
+    return region
+
+def _regiones_zonas_bd(clusters):
+    """Consulta región y zona de todos los clusters en una sola consulta.
+    Retorna {cluster: (region, zona)} o None si no se pudo consultar la BD"""
+    conn = conexion_bd()
+    if conn is None:
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        with metricas.etapa("regiones_zonas", metricas.CONSULTA, clusters=len(clusters)) as registro:
+            cursor.execute(
+                "SELECT DISTINCT ON (cluster) cluster, region, zona FROM inv_naps "
+                "WHERE cluster = ANY(%s) ORDER BY cluster",
+                ([str(cluster) for cluster in clusters],)
+            )
+            filas = cursor.fetchall()
+            registro["filas"] = len(filas)
+        return {fila[0]: (fila[1], fila[2]) for fila in filas}
+    except Exception as e:
+        logging.error(f"Error al obtener región y zona de la BD: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def resolver_regiones_zonas(clusters, ruta=RUTA_DATA, snapshot=False):
+    """Obtiene la región y zona de todos los clusters indicados con una sola lectura del Excel
+    y, si hace falta, la caché en disco y una sola consulta a la BD (o al snapshot local) para los
+    clusters que no estén en ella. Retorna {cluster: (region, zona)}"""
+    clusters = list(dict.fromkeys(clusters))
     # Primero intentamos obtener los datos del Excel
-    region, zona = get_region_zone_from_excel()
+    region, zona = get_region_zone_from_excel(ruta)
+    resultado = {cluster: (region, zona) for cluster in clusters}
     
-    # Si no hay datos en el Excel, entonces consultamos la BD
-    if region == "Sin dato" or zona == "Sin dato":
-        conn = conexion_bd()
-        
-        if conn is not None:
-            try:
-                cursor = conn.cursor()
-                # Consultar región y zona basado en el cluster
-                cursor.execute("SELECT region, zona FROM inv_naps WHERE cluster = %s LIMIT 1", (cluster,))
-                result = cursor.fetchone()
-                if result:
-                    region = result[0] if result[0] else "Sin dato"
-                    zona = result[1] if result[1] else "Sin dato"
-                else:
-                    # Buscar patrones R1 o R2 en el código del cluster
-                    if "R1" in str(cluster).upper():
-                        region = "R1"
-                    elif "R2" in str(cluster).upper():
-                        region = "R2"
-                    
-                cursor.close()
-                conn.close()
-            except Exception as e:
-                logging.error(f"Error al obtener región y zona de la BD: {e}")
+    # Si no hay datos en el Excel, entonces consultamos la caché y la BD para todos los clusters a la vez
+    if clusters and (region == "Sin dato" or zona == "Sin dato"):
+        encontrados = cache_regiones.obtener(clusters)
+        pendientes = [cluster for cluster in clusters if str(cluster) not in encontrados]
+        consultados = {}
+        if pendientes:
+            consultados = snapshot_naps.regiones_zonas(pendientes) if snapshot else _regiones_zonas_bd(pendientes)
+            if consultados is not None:
+                cache_regiones.guardar(consultados)
+        for cluster in clusters:
+            if str(cluster) in encontrados or (consultados and str(cluster) in consultados):
+                region_bd, zona_bd = encontrados.get(str(cluster)) or consultados[str(cluster)]
+                resultado[cluster] = (region_bd if region_bd else "Sin dato", zona_bd if zona_bd else "Sin dato")
+            elif consultados is not None:
+                # Buscar patrones R1 o R2 en el código del cluster
+                resultado[cluster] = (region_por_nombre_cluster(cluster, region), zona)
     
+    logging.info(f"Región y zona resueltas para {len(resultado)} clusters")
+    return resultado
+
+# Caché en memoria delante de la caché en disco de cache_regiones
+@lru_cache(maxsize=128)
+def get_region_zone_from_db(cluster):
+    """Obtiene la región y zona desde la base de datos según el cluster"""
+    region, zona = resolver_regiones_zonas([cluster])[cluster]
     logging.info(f"Región y zona finales para cluster {cluster}: {region}, {zona}")
     return region, zona
 
-def busqueda_naps_bd():
-    result = lectura_naps()
-    if result is None:
-        return
+# Parámetros del cálculo de NAPs faltantes
+TAMANO_LOTE_NAPS = 10000          # códigos por consulta "= ANY(%s)"
+UMBRAL_TABLA_TEMPORAL = 20000     # a partir de aquí se usa COPY a una tabla temporal
+
+def _texto_copy(valor):
+    """Escapa un valor para el formato de texto de COPY"""
+    return valor.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def _naps_faltantes_any(cursor, codigos):
+    """Consulta los NAPs existentes en lotes con un único parámetro de tipo arreglo"""
+    existentes = set()
+    for inicio in range(0, len(codigos), TAMANO_LOTE_NAPS):
+        lote = codigos[inicio:inicio + TAMANO_LOTE_NAPS]
+        cursor.execute("SELECT nap FROM inv_naps WHERE nap = ANY(%s)", (lote,))
+        existentes.update(fila[0] for fila in cursor.fetchall())
+    return set(codigos) - existentes
+
+def _naps_faltantes_copy(cursor, codigos):
+    """Carga los códigos con COPY en una tabla temporal y obtiene los faltantes con un anti-join"""
+    cursor.execute("CREATE TEMP TABLE tmp_naps_excel (nap text) ON COMMIT DROP")
+    datos = io.StringIO("".join(f"{_texto_copy(codigo)}\n" for codigo in codigos))
+    cursor.copy_expert("COPY tmp_naps_excel (nap) FROM STDIN", datos)
+    cursor.execute("ANALYZE tmp_naps_excel")
+    cursor.execute(
+        "SELECT t.nap FROM tmp_naps_excel t "
+        "WHERE NOT EXISTS (SELECT 1 FROM inv_naps i WHERE i.nap = t.nap)"
+    )
+    return {fila[0] for fila in cursor.fetchall()}
+
+def naps_faltantes(conn, cursor, codigos_nap):
+    """Retorna el conjunto de códigos NAP (con su valor original del Excel) que no existen en inv_naps"""
+    # La BD compara texto: normalizar los códigos y recordar su valor original
+    originales = {str(codigo): codigo for codigo in codigos_nap}
+    codigos = list(originales)
+
+    with metricas.etapa("naps_faltantes", metricas.CONSULTA, codigos=len(codigos)) as registro:
+        faltantes = None
+        if len(codigos) > UMBRAL_TABLA_TEMPORAL:
+            try:
+                faltantes = _naps_faltantes_copy(cursor, codigos)
+                registro["metodo"] = "copy"
+            except psycopg2.Error as e:
+                # Sin permisos para tablas temporales: volver a las consultas por lotes
+                logging.warning(f"No se pudo usar la tabla temporal, se consulta por lotes: {e}")
+                conn.rollback()
+        if faltantes is None:
+            faltantes = _naps_faltantes_any(cursor, codigos)
+            registro["metodo"] = "any"
+        registro["filas"] = len(faltantes)
+
+    logging.info(f"{len(codigos)} códigos NAP verificados, {len(faltantes)} faltantes en la BD")
+    return {originales[codigo] for codigo in faltantes}
+
+def procesar_faltantes(tabla, codigos_faltantes, formatos, ruta, dir_salida, snapshot=False, carga_bd=None):
+    """Muestra los NAPs faltantes, exporta sus registros y, si se pide, los carga en inv_naps.
+    carga_bd puede ser None, CARGA_APLICAR o CARGA_SIMULAR (carga y deshace para informar los conteos)."""
+    if not codigos_faltantes:
+        print("Todos los códigos NAP del Excel están presentes en la BD.")
+        return set()
+
+    print("Códigos NAP faltantes en la BD:")
+    print(codigos_faltantes)
+    
+    # Construir los registros solo de los NAPs faltantes
+    faltantes = tabla[tabla["codigo_nap"].isin(codigos_faltantes)]
+    # Resolver región y zona de todos los clusters involucrados de una vez
+    regiones = resolver_regiones_zonas(faltantes["cluster"].unique().tolist(), ruta, snapshot)
+    # Los registros se arman por bloques con operaciones por columna y cada bloque se escribe
+    # apenas se construye, sin acumular todas las filas en memoria
+    filas = (fila for bloque in bloques_registros_naps(faltantes, regiones) for fila in bloque)
+    if carga_bd:
+        # Las filas se usan dos veces: en el archivo y en la carga
+        filas = list(filas)
     
-    # Desempaquetar el resultado con el nuevo elemento nap_data
-    hub, cluster, olt, frame, slot, puerto, codigos_nap_excel, puertos_nap, latitud, longitud, nap_data = result
+    # Exportar todos los registros en los formatos solicitados
+    exportar_filas_naps(filas, formatos, dir_salida)
+    if carga_bd and cargar_naps_bd(filas, simular=carga_bd == CARGA_SIMULAR) is None:
+        return None
+    return codigos_faltantes
+
+def busqueda_naps_bd(formatos=("xlsx",), ruta=RUTA_DATA, dir_salida=DIR_REGISTROS, snapshot=False,
+                     sincronizar=True, incremental=False, carga_bd=None):
+    """Valida los NAPs del Excel contra la BD y exporta los faltantes.
+    Con snapshot=True se valida contra la copia local de inv_naps, tras una sincronización incremental
+    (sincronizar=False la omite cuando ya se hizo antes, por ejemplo al procesar varios libros).
+    Con incremental=True solo se validan las filas nuevas o modificadas desde la última ejecución
+    (los NAPs que faltaban en esa ejecución se validan siempre).
+    Con carga_bd (CARGA_APLICAR o CARGA_SIMULAR) los faltantes además se insertan en inv_naps.
+    Retorna el conjunto de códigos faltantes (vacío si no falta ninguno) o None si hubo errores."""
+    tabla = lectura_naps_tabla(ruta)
+    if tabla is None:
+        return None
+
+    if not incremental:
+        return validar_tabla_naps(tabla, formatos, ruta, dir_salida, snapshot, sincronizar, carga_bd)
+
+    hashes = manifiesto_naps.hashes_filas(tabla)
+    cambiadas = manifiesto_naps.filas_cambiadas(ruta, tabla, hashes)
+    pendientes = tabla if cambiadas is None else tabla[cambiadas.to_numpy()]
+    if cambiadas is not None:
+        logging.info(f"{len(pendientes)} de {len(tabla)} NAPs nuevos o modificados desde la última ejecución")
+    if pendientes.empty:
+        print("Ningún NAP cambió desde la última ejecución (use la validación completa para revisarlos todos).")
+        resultado = set()
+    else:
+        resultado = validar_tabla_naps(pendientes, formatos, ruta, dir_salida, snapshot, sincronizar, carga_bd)
+    # Solo se recuerda lo validado si la validación terminó bien, y nunca los NAPs faltantes:
+    # así se vuelven a revisar (y a reportar) en cada ejecución hasta que aparezcan en inv_naps
+    if resultado is not None:
+        presentes = ~tabla["codigo_nap"].isin(resultado).to_numpy()
+        manifiesto_naps.guardar_manifiesto(ruta, tabla[presentes], hashes[presentes])
+    return resultado
+
+def validar_tabla_naps(tabla, formatos, ruta, dir_salida, snapshot=False, sincronizar=True, carga_bd=None):
+    """Valida las filas de la tabla contra inv_naps (o el snapshot) y exporta los faltantes"""
+    codigos_nap_excel = tabla["codigo_nap"].tolist()
+
+    if snapshot:
+        # Si la BD no responde se valida con la última copia disponible
+        if sincronizar:
+            snapshot_naps.sincronizar_snapshot()
+        if not snapshot_naps.existe_snapshot():
+            logging.error("No hay un snapshot local de inv_naps y no se pudo sincronizar")
+            return None
+        codigos_faltantes = snapshot_naps.naps_faltantes(codigos_nap_excel)
+        return procesar_faltantes(tabla, codigos_faltantes, formatos, ruta, dir_salida, snapshot=True,
+                                  carga_bd=carga_bd)
 
     conn = conexion_bd()
     if conn is not None:
         try:
             cursor = conn.cursor()
-            # Optimizar consulta para obtener solo los NAPs que necesitamos verificar
-            placeholders = ','.join(['%s'] * len(codigos_nap_excel))
-            query = f"SELECT nap FROM inv_naps WHERE nap IN ({placeholders})"
-            cursor.execute(query, codigos_nap_excel)
-            codigos_nap_bd = {row[0] for row in cursor.fetchall()}
-            
-            codigos_faltantes = set(codigos_nap_excel) - codigos_nap_bd
-            if codigos_faltantes:
-                print("Códigos NAP faltantes en la BD:")
-                print(codigos_faltantes)
-                
-                # Procesar en lotes para mejor rendimiento
-                registros = []
-                batch_size = 100
-                current_batch = []
-                
-                # Iterar sobre los datos completos de cada NAP
-                for nap_info in nap_data:
-                    if nap_info["codigo_nap"] in codigos_faltantes:
-                        registro = crear_registro_nap(
-                            nap_info["hub"], 
-                            nap_info["cluster"], 
-                            nap_info["olt"], 
-                            nap_info["frame"], 
-                            nap_info["slot"], 
-                            nap_info["puerto"], 
-                            nap_info["codigo_nap"], 
-                            nap_info["puertos_nap"], 
-                            nap_info["latitud"], 
-                            nap_info["longitud"]
-                        )
-                        current_batch.append(registro)
-                        
-                        # Procesar lotes para evitar sobrecarga de memoria
-                        if len(current_batch) >= batch_size:
-                            registros.extend(current_batch)
-                            current_batch = []
-                
-                # Añadir el último lote si existe
-                if current_batch:
-                    registros.extend(current_batch)
-                
-                # Exportar todos los registros a un único archivo Excel
-                exportar_registros_naps(registros)
-                
-                return codigos_faltantes
-            else:
-                print("Todos los códigos NAP del Excel están presentes en la BD.")
+            codigos_faltantes = naps_faltantes(conn, cursor, codigos_nap_excel)
+            return procesar_faltantes(tabla, codigos_faltantes, formatos, ruta, dir_salida, carga_bd=carga_bd)
         except psycopg2.Error as e:
             logging.error(f"Error al ejecutar la consulta: {e}")
         finally:
             cursor.close()
             conn.close()
 
-def crear_registro_nap(hub, cluster, olt, frame, slot, puerto, nap, puertos_nap, latitud, longitud):
-    # Obtener región y zona de la BD si están vacías o son "Sin dato"
-    region, zona = get_region_zone_from_db(cluster)
+def crear_registro_nap(hub, cluster, olt, frame, slot, puerto, nap, puertos_nap, latitud, longitud, region_zona=None):
+    # Obtener región y zona de la BD si están vacías o son "Sin dato" (salvo que ya vengan resueltas)
+    region, zona = region_zona if region_zona is not None else get_region_zone_from_db(cluster)
     
     # Procesar coordenadas de manera más eficiente
     coordenadas = "(Sin coordenadas)"
@@ -323,21 +403,302 @@ def crear_registro_nap(hub, cluster, olt, frame, slot, puerto, nap, puertos_nap,
         "longitud": long_str
     }
 
-def exportar_registros_naps(registros):
+# Columnas del archivo Registros_Naps en el orden de crear_registro_nap
+COLUMNAS_REGISTRO = ["hub", "cluster", "olt", "frame", "slot", "puerto", "nap", "puertos_nap",
+                     "coordenadas", "fecha_de_liberacion", "region", "zona", "latitud", "longitud"]
+TIPOS_PARQUET_REGISTRO = {"frame": "int64", "slot": "int64", "puerto": "int64", "puertos_nap": "int64"}
+TAMANO_BLOQUE_REGISTROS = 10000   # filas por bloque de construir_registros_naps
+
+def _columnas_registro(naps, regiones):
+    """Valores de cada columna de COLUMNAS_REGISTRO, como listas, para los NAPs dados.
+    Las coordenadas llegan como float64 de lectura_naps_tabla (0 si la celda estaba vacía)
+    y se formatean por columna en lugar de una llamada por NAP."""
+    latitud = naps["latitud"].to_numpy(dtype="float64")
+    longitud = naps["longitud"].to_numpy(dtype="float64")
+    con_coordenadas = (latitud != 0) & (longitud != 0)
+
+    # Solo se formatean las filas con coordenadas; el resto queda con los valores por defecto
+    coordenadas = np.full(len(naps), "(Sin coordenadas)", dtype=object)
+    latitud_txt = np.full(len(naps), "", dtype=object)
+    longitud_txt = np.full(len(naps), "", dtype=object)
+    latitud_fmt = ["%.6f" % valor for valor in latitud[con_coordenadas].tolist()]
+    longitud_fmt = ["%.6f" % valor for valor in longitud[con_coordenadas].tolist()]
+    coordenadas[con_coordenadas] = [f"({lon}, {lat})" for lon, lat in zip(longitud_fmt, latitud_fmt)]
+    latitud_txt[con_coordenadas] = [valor.replace(".", ",") for valor in latitud_fmt]
+    longitud_txt[con_coordenadas] = [valor.replace(".", ",") for valor in longitud_fmt]
+
+    clusters = naps["cluster"].tolist()
+    region_zona = [regiones[cluster] for cluster in clusters]
+    return {
+        "hub": naps["hub"].tolist(),
+        "cluster": clusters,
+        "olt": naps["olt"].tolist(),
+        "frame": naps["frame"].tolist(),
+        "slot": naps["slot"].tolist(),
+        "puerto": naps["puerto"].tolist(),
+        "nap": naps["codigo_nap"].tolist(),
+        "puertos_nap": naps["puertos_nap"].tolist(),
+        "coordenadas": coordenadas.tolist(),
+        "fecha_de_liberacion": [fecha_hoy()] * len(naps),
+        "region": [region for region, _ in region_zona],
+        "zona": [zona for _, zona in region_zona],
+        "latitud": latitud_txt.tolist(),
+        "longitud": longitud_txt.tolist(),
+    }
+
+def construir_registros_naps(naps, regiones):
+    """Versión por lotes de crear_registro_nap para un conjunto de NAPs (columnas de COLUMNAS_NAP).
+    regiones: {cluster: (region, zona)} de resolver_regiones_zonas.
+    Retorna un DataFrame con las columnas de COLUMNAS_REGISTRO y los mismos valores que crear_registro_nap."""
+    return pd.DataFrame(_columnas_registro(naps, regiones), columns=COLUMNAS_REGISTRO)
+
+def bloques_registros_naps(naps, regiones, tamano_bloque=TAMANO_BLOQUE_REGISTROS):
+    """Genera los registros por bloques de tamano_bloque NAPs: cada bloque es una lista de filas
+    con los valores en el orden de COLUMNAS_REGISTRO, lista para exportar_filas_naps"""
+    for inicio in range(0, len(naps), tamano_bloque):
+        columnas = _columnas_registro(naps.iloc[inicio:inicio + tamano_bloque], regiones)
+        yield list(zip(*(columnas[columna] for columna in COLUMNAS_REGISTRO)))
+
+def exportar_registros_naps(registros, formatos=("xlsx",), dir_salida=DIR_REGISTROS):
+    """Escribe los registros (diccionarios de crear_registro_nap) a medida que se generan
+    (acepta listas o generadores). Retorna la lista de archivos creados."""
+    filas = ([registro[columna] for columna in COLUMNAS_REGISTRO] for registro in registros)
+    return exportar_filas_naps(filas, formatos, dir_salida)
+
+def exportar_filas_naps(filas, formatos=("xlsx",), dir_salida=DIR_REGISTROS):
+    """Escribe filas con los valores en el orden de COLUMNAS_REGISTRO a medida que se generan.
+    Retorna la lista de archivos creados."""
     # Crear el directorio si no existe
-    os.makedirs("Registros_Naps", exist_ok=True)
-    
-    # Nombre del archivo único
-    filename = f"Registros_Naps/Inventario_Naps_{fecha_hoy().replace('/', '-')}.xlsx"
-    
-    # Crear DataFrame con todos los registros
-    df = pd.DataFrame(registros)
+    os.makedirs(dir_salida, exist_ok=True)
     
-    # Guardar todos los registros en un único archivo Excel
-    df.to_excel(filename, index=False)
+    # Nombre del archivo único (la extensión depende del formato)
+    ruta_base = os.path.join(dir_salida, f"Inventario_Naps_{fecha_hoy().replace('/', '-')}")
+    escritores = [
+        escritor for escritor in (
+            crear_escritor(formato, ruta_base, COLUMNAS_REGISTRO, tipos_parquet=TIPOS_PARQUET_REGISTRO)
+            for formato in formatos
+        ) if escritor is not None
+    ]
     
-    logging.info(f"Archivo '{filename}' con {len(registros)} NAPs generado correctamente")
-    print(f"Se ha creado el archivo '{filename}' con {len(registros)} registros de NAP")
+    total = 0
+    # Incluye la creación de los registros, que se generan a medida que se escriben
+    with metricas.etapa("exportar_registros_naps", metricas.EXPORTACION, formatos=list(formatos)) as medicion:
+        try:
+            for fila in filas:
+                for escritor in escritores:
+                    escritor.escribir(fila)
+                total += 1
+        finally:
+            for escritor in escritores:
+                escritor.cerrar()
+        archivos = [escritor.ruta for escritor in escritores]
+        medicion["filas"] = total
+        medicion["bytes"] = sum(metricas.tamano_archivo(archivo) or 0 for archivo in archivos)
+
+    for filename in archivos:
+        logging.info(f"Archivo '{filename}' con {total} NAPs generado correctamente")
+        print(f"Se ha creado el archivo '{filename}' con {total} registros de NAP")
+    return archivos
+
+# Modos de carga directa de los NAPs faltantes en inv_naps
+CARGA_APLICAR = "aplicar"
+CARGA_SIMULAR = "simular"
+
+def _valor_copy(valor):
+    """Convierte un valor del registro al formato de texto de COPY (None como NULL)"""
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return "\\N"
+    return _texto_copy(str(valor))
+
+def cargar_naps_bd(filas, simular=False):
+    """Carga las filas (valores en el orden de COLUMNAS_REGISTRO) con COPY en una tabla temporal y los inserta en inv_naps en una sola transacción,
+    omitiendo los NAPs que ya existan. Con simular=True se deshace la transacción y solo se informan los conteos.
+    Retorna {"recibidos", "insertados", "omitidos"} o None si hubo errores (no se inserta nada)."""
+    conn = conexion_bd()
+    if conn is None:
+        logging.error("No se pudo conectar a la base de datos para cargar los NAPs")
+        return None
+
+    columnas = ", ".join(COLUMNAS_REGISTRO)
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        with metricas.etapa("cargar_naps_bd", metricas.EXPORTACION, simulacion=simular) as medicion:
+            cursor.execute("CREATE TEMP TABLE stg_inv_naps (LIKE inv_naps INCLUDING DEFAULTS) ON COMMIT DROP")
+            datos = io.StringIO("".join(
+                "\t".join(_valor_copy(valor) for valor in fila) + "\n"
+                for fila in filas
+            ))
+            cursor.copy_expert(f"COPY stg_inv_naps ({columnas}) FROM STDIN", datos)
+            cursor.execute("SELECT count(*) FROM stg_inv_naps")
+            recibidos = cursor.fetchone()[0]
+            # DISTINCT ON: un código repetido en la hoja se inserta una sola vez
+            cursor.execute(
+                f"INSERT INTO inv_naps ({columnas}) "
+                f"SELECT DISTINCT ON (s.nap) {', '.join('s.' + columna for columna in COLUMNAS_REGISTRO)} "
+                "FROM stg_inv_naps s "
+                "WHERE NOT EXISTS (SELECT 1 FROM inv_naps i WHERE i.nap = s.nap) "
+                "ORDER BY s.nap"
+            )
+            insertados = cursor.rowcount
+            medicion["filas"] = insertados
+        if simular:
+            conn.rollback()
+        else:
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        logging.error(f"Error al cargar los NAPs en inv_naps, no se insertó ninguno: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+    resumen = {"recibidos": recibidos, "insertados": insertados, "omitidos": recibidos - insertados}
+    accion = "se insertarían" if simular else "insertados"
+    print(f"Carga en inv_naps{' (simulación, sin cambios)' if simular else ''}: "
+          f"{resumen['recibidos']} recibidos, {resumen['insertados']} {accion}, {resumen['omitidos']} omitidos")
+    return resumen
+
+# Validación espacial de las coordenadas de la hoja (opcional, no bloquea la validación contra la BD)
+RADIO_DUPLICADOS_M = 5.0          # NAPs a esta distancia o menos se consideran superpuestos
+DISTANCIA_CLUSTER_M = 3000.0      # NAPs más lejos que esto del centro de su cluster se consideran fuera de él
+ALERTA_DUPLICADO = "duplicado"
+ALERTA_DUPLICADO_INVENTARIO = "duplicado_inventario"
+ALERTA_FUERA_CLUSTER = "fuera_del_cluster"
+ALERTA_INVERTIDAS = "coordenadas_invertidas"
+ALERTA_FUERA_RANGO = "fuera_de_rango"
+COLUMNAS_ALERTA = ["codigo_nap", "cluster", "alerta", "latitud", "longitud", "referencia", "distancia_m"]
+TIPOS_PARQUET_ALERTA = {"latitud": "float64", "longitud": "float64", "distancia_m": "float64"}
+
+def _coordenada_numerica(serie):
+    """inv_naps guarda las coordenadas como texto con coma decimal"""
+    return pd.to_numeric(serie.astype("string").str.replace(",", ".", regex=False), errors="coerce")
+
+def coordenadas_inventario(clusters):
+    """Coordenadas de los NAPs ya registrados en inv_naps para esos clusters.
+    Retorna un DataFrame (nap, latitud, longitud) o None si no se pudo consultar la BD"""
+    conn = conexion_bd()
+    if conn is None:
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        with metricas.etapa("coordenadas_inventario", metricas.CONSULTA, clusters=len(clusters)) as registro:
+            cursor.execute("SELECT nap, latitud, longitud FROM inv_naps WHERE cluster = ANY(%s)",
+                           ([str(cluster) for cluster in clusters],))
+            inventario = pd.DataFrame(cursor.fetchall(), columns=["nap", "latitud", "longitud"])
+            registro["filas"] = len(inventario)
+    except psycopg2.Error as e:
+        logging.error(f"Error al obtener las coordenadas de inv_naps: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+    inventario["nap"] = inventario["nap"].astype(str)
+    inventario["latitud"] = _coordenada_numerica(inventario["latitud"])
+    inventario["longitud"] = _coordenada_numerica(inventario["longitud"])
+    return inventario
+
+def alertas_coordenadas(tabla, radio_m=RADIO_DUPLICADOS_M, distancia_cluster_m=DISTANCIA_CLUSTER_M,
+                        inventario=None):
+    """Busca NAPs superpuestos (entre sí y, si se entrega, contra el inventario) y NAPs lejos del
+    centro de su cluster. Retorna una lista de alertas con las columnas de COLUMNAS_ALERTA."""
+    latitudes = tabla["latitud"].to_numpy(dtype="float64")
+    longitudes = tabla["longitud"].to_numpy(dtype="float64")
+    codigos = tabla["codigo_nap"].to_numpy()
+    clusters = tabla["cluster"].to_numpy()
+    alertas = []
+
+    def alerta(i, tipo, referencia, distancia):
+        alertas.append({"codigo_nap": codigos[i], "cluster": clusters[i], "alerta": tipo,
+                        "latitud": latitudes[i], "longitud": longitudes[i], "referencia": referencia,
+                        "distancia_m": None if distancia is None else round(float(distancia), 1)})
+
+    validas = indice_espacial.coordenadas_validas(latitudes, longitudes)
+    # Celdas vacías quedan en 0; lo que no es 0 y no es una coordenada posible se informa aparte
+    sin_coordenadas = (latitudes == 0) | (longitudes == 0) | np.isnan(latitudes) | np.isnan(longitudes)
+    for i in np.flatnonzero(~validas & ~sin_coordenadas):
+        alerta(i, ALERTA_FUERA_RANGO, None, None)
+
+    posiciones = np.flatnonzero(validas)
+    if len(posiciones) == 0:
+        return alertas
+    latitudes_validas = latitudes[posiciones]
+    longitudes_validas = longitudes[posiciones]
+
+    latitud_maxima = float(np.abs(latitudes_validas).max())
+    if inventario is not None and not inventario.empty:
+        # Los NAPs del inventario que también están en la hoja ya se comparan entre sí
+        inventario = inventario[indice_espacial.coordenadas_validas(inventario["latitud"], inventario["longitud"])
+                                & ~inventario["nap"].isin({str(codigo) for codigo in codigos})]
+        if not inventario.empty:
+            latitud_maxima = max(latitud_maxima, float(inventario["latitud"].abs().max()))
+    indice = indice_espacial.IndiceGrilla(latitudes_validas, longitudes_validas, radio_m, latitud_maxima)
+
+    for par in indice.pares_cercanos(radio_m).itertuples(index=False):
+        i, j = posiciones[par.i], posiciones[par.j]
+        alerta(i, ALERTA_DUPLICADO, codigos[j], par.distancia_m)
+
+    if inventario is not None and not inventario.empty:
+        naps_inventario = inventario["nap"].to_numpy()
+        pares = indice.cercanos_a(inventario["latitud"], inventario["longitud"], radio_m)
+        for par in pares.itertuples(index=False):
+            alerta(posiciones[par.j], ALERTA_DUPLICADO_INVENTARIO, naps_inventario[par.i], par.distancia_m)
+
+    lejanos = indice_espacial.lejanos_del_centro(clusters[posiciones], latitudes_validas, longitudes_validas,
+                                                  distancia_cluster_m)
+    for fila in lejanos.itertuples(index=False):
+        alerta(posiciones[fila.i], ALERTA_INVERTIDAS if fila.invertida else ALERTA_FUERA_CLUSTER,
+               "centro del cluster", fila.distancia_m)
+    return alertas
+
+def validar_coordenadas(ruta=RUTA_DATA, dir_salida=DIR_REGISTROS, formatos=("xlsx",), radio_m=RADIO_DUPLICADOS_M,
+                        distancia_cluster_m=DISTANCIA_CLUSTER_M, con_inventario=False):
+    """Revisa las coordenadas de toda la hoja y exporta las alertas encontradas.
+    Con con_inventario=True también compara contra los NAPs registrados en inv_naps de los mismos clusters.
+    Retorna la lista de alertas o None si hubo errores."""
+    if radio_m <= 0 or distancia_cluster_m <= 0:
+        logging.error("El radio de duplicados y la distancia al cluster deben ser mayores que cero")
+        return None
+    tabla = lectura_naps_tabla(ruta)
+    if tabla is None:
+        return None
+
+    inventario = None
+    if con_inventario:
+        inventario = coordenadas_inventario(tabla["cluster"].unique().tolist())
+        if inventario is None:
+            logging.warning("No se pudo consultar inv_naps; se validan solo las coordenadas de la hoja")
+
+    with metricas.etapa("validar_coordenadas", metricas.TRANSFORMACION, filas=len(tabla)) as medicion:
+        alertas = alertas_coordenadas(tabla, radio_m, distancia_cluster_m, inventario)
+        medicion["alertas"] = len(alertas)
+
+    if not alertas:
+        print("No se encontraron NAPs superpuestos ni fuera de su cluster.")
+        return alertas
+
+    conteos = pd.Series([alerta["alerta"] for alerta in alertas]).value_counts()
+    print("Alertas de coordenadas:")
+    for tipo, cantidad in conteos.items():
+        print(f"  {tipo}: {cantidad}")
+
+    os.makedirs(dir_salida, exist_ok=True)
+    ruta_base = os.path.join(dir_salida, f"Alertas_Coordenadas_{fecha_hoy()}")
+    for formato in formatos:
+        escritor = crear_escritor(formato, ruta_base, COLUMNAS_ALERTA, tipos_parquet=TIPOS_PARQUET_ALERTA)
+        if escritor is None:
+            continue
+        try:
+            for alerta in alertas:
+                escritor.escribir([alerta[columna] for columna in COLUMNAS_ALERTA])
+        finally:
+            escritor.cerrar()
+        print(f"Se ha creado el archivo '{escritor.ruta}' con {len(alertas)} alertas de coordenadas")
+    return alertas
 
 # Función exportacion_data obsoleta, se mantiene para compatibilidad
 def exportacion_data(hub, cluster, olt, frame, slot, puerto, nap, puertos_nap, latitud, longitud):
@@ -348,17 +709,32 @@ def fecha_hoy():
     #generar fecha con este formato aaaa-mm-dd
     return time.strftime("%Y-%m-%d")
 
-def presentacion_resultados():
+def presentacion_resultados(ruta=RUTA_DATA, dir_salida=DIR_REGISTROS, formatos=("xlsx",), snapshot=False,
+                            sincronizar=True, incremental=False, carga_bd=None, validacion_espacial=None):
     print("-----------------------------------------------------")
     print("      SISTEMA DE VALIDACIÓN Y REGISTRO DE NAPs       ")
     print("-----------------------------------------------------")
     print("Iniciando validación de NAPs en base de datos...")
-    busqueda_naps_bd()
+    resultado = busqueda_naps_bd(formatos, ruta, dir_salida, snapshot, sincronizar, incremental, carga_bd)
+    if validacion_espacial is not None:
+        print("-----------------------------------------------------")
+        print("Revisando coordenadas de los NAPs...")
+        validar_coordenadas(ruta, dir_salida, formatos, **validacion_espacial)
     print("-----------------------------------------------------")
     print("Proceso completado.")
+    return resultado
 
-def main():
-    presentacion_resultados()
+def main(ruta_entrada=RUTA_DATA, dir_salida=DIR_REGISTROS, formatos=("xlsx",), snapshot=False, sincronizar=True,
+         incremental=False, carga_bd=None, validacion_espacial=None):
+    """Ejecuta la validación de NAPs; retorna True si terminó correctamente.
+    Por defecto valida todos los NAPs; incremental=True revisa solo los nuevos o modificados.
+    validacion_espacial: None o un diccionario con los argumentos de validar_coordenadas
+    (radio_m, distancia_cluster_m, con_inventario); las alertas no cambian el resultado."""
+    return presentacion_resultados(ruta_entrada, dir_salida, formatos, snapshot, sincronizar,
+                                   incremental, carga_bd, validacion_espacial) is not None
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    #configuracion logging
+    logging.basicConfig(level=logging.DEBUG)
+    main(snapshot="--snapshot" in sys.argv[1:], incremental="--incremental" in sys.argv[1:],
+         validacion_espacial={} if "--coordenadas" in sys.argv[1:] else None)
\ No newline at end of file
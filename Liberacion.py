@@ -1,142 +1,133 @@
-import json
 import logging
 import os
+import sys
 import pandas as pd 
-import psycopg2
 import hashlib
+import itertools
 from datetime import datetime, date
-from openpyxl.styles import Font
-from openpyxl.comments import Comment
+from base_datos import conexion_bd
+from lector_excel import leer_hoja, RUTA_DATA
+from exportadores import EscritorXlsx, EscritorXlsxHojas
+import metricas
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Carpeta donde se generan los archivos de alcance y liberación
+DIR_GENERADOR = "generador"
+
+# Formas de calcular el alcance: historial en pandas, por bloques con un cursor del servidor
+# o agregado en PostgreSQL (solo viaja la fila resumen)
+MODO_PANDAS = "pandas"
+MODO_STREAMING = "streaming"
+MODO_SQL = "sql"
+MODOS_ALCANCE = (MODO_PANDAS, MODO_STREAMING, MODO_SQL)
+
+# Campos de una fila de la hoja 'Liberacion', en el orden de extraer_datos_fila
+CAMPOS_ESPEC = (
+    "hub", "proveedor", "hostname", "tipo_de_red", "tipo_de_zona", "tipo_de_cobertura",
+    "region", "zona", "parroquia", "feeder", "cluster",
+    "horizontal_residencial_hps", "horizontal_comercial_hps",
+    "vertical_residencial_hps", "vertical_comercial_hps",
+    "cantidad_edificios_proyectados", "edif_resid_proyectados_hps",
+    "edif_comercial_proyectados_hps", "solares", "hps_totales", "puertos_habilitados",
 )
 
-# Variables globales que se inicializarán después de leer los datos
-HUB = None
-PROVEEDOR = None
-HOSTNAME = None
-TIPO_DE_RED = None
-TIPO_DE_ZONA = None
-TIPO_DE_COBERTURA = None
-REGION = None
-ZONA = None
-PARROQUIA = None
-FEEDER = None
-CLUSTER = None
-HORIZONTAL_RESIDENCIAL_HPs = None
-HORIZONTAL_COMERCIAL_HPs = None
-VERTICAL_RESIDENCIAL_HPs = None
-VERTICAL_COMERCIAL_HPs = None
-CANTIDAD_EDIFICIOS_PROYECTADOS = None
-EDIF_RESID_PROYECTADOS_HPs = None
-EDIF_COMERCIAL_PROYECTADOS_HPs = None
-SOLARES = None
-HPs_TOTALES = None
-PUERTOS_HABILITADOS = None
-HOME_PASSES_TOTAL = None
-BUSINESS_PASSES_TOTAL = None
-
-def conexion_bd():
-    try:
-        with open("configuracion/conexion.json", "r") as archivo:
-            credenciales = json.load(archivo)
-        
-        conn = psycopg2.connect(
-            dbname=credenciales["PostgresSQL"]["database"],
-            user=credenciales["PostgresSQL"]["user"],
-            password=credenciales["PostgresSQL"]["password"],
-            host=credenciales["PostgresSQL"]["host"],
-            port=credenciales["PostgresSQL"]["port"]
-        )
-        
-        if conn is not None:
-            logging.info("Conexión exitosa a la base de datos")
-            return conn
-    except Exception as e:
-        logging.error(f"Error al conectar a la base de datos: {e}")
-        return None
+class EspecCluster:
+    """Datos de liberación de un cluster (una fila de la hoja 'Liberacion').
+    Se pasa explícitamente por el flujo para poder procesar varios clusters a la vez."""
+    __slots__ = CAMPOS_ESPEC + ("home_passes_total", "business_passes_total")
+
+    def __init__(self, *valores):
+        if len(valores) != len(CAMPOS_ESPEC):
+            raise ValueError(f"Se esperaban {len(CAMPOS_ESPEC)} campos y se recibieron {len(valores)}")
+        for campo, valor in zip(CAMPOS_ESPEC, valores):
+            setattr(self, campo, valor)
+        # Calcular los totales de home passes y business passes
+        self.home_passes_total = self.hps_totales - self.horizontal_comercial_hps - self.vertical_comercial_hps
+        self.business_passes_total = self.horizontal_comercial_hps + self.vertical_comercial_hps
+
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(*extraer_datos_fila(fila))
 
-def lectura_data():
+    def __repr__(self):
+        return f"EspecCluster(cluster={self.cluster!r}, region={self.region!r})"
+
+def extraer_datos_fila(fila):
+    """Obtiene los datos de liberación de una fila de la hoja 'Liberacion'"""
+    return (
+        fila["HUB"],
+        fila["PROVEEDOR"],
+        fila["HOSTNAME"],
+        fila["TIPO DE RED"],
+        fila["TIPO DE ZONA"],
+        fila["TIPO DE COBERTURA"],
+        fila["REGIÓN"],
+        fila["ZONA"],
+        fila["PARROQUIA"],
+        fila["FEEDER"],
+        fila["CLUSTER"],
+        fila["Horizontal Residencial (HPs)"],
+        fila["Horizontal Comercial (HPs)"],
+        fila["Vertical Residencial (HPs)"],
+        fila["Vertical Comercial (HPs)"],
+        fila["Cantidad de Edificios Proyectados"],
+        fila["Edif Resid Proyectados (HPs)"],
+        fila["Edif Comercial Proyectados (HPs)"],
+        fila["Solares"],
+        fila["HP'S TOTALES"],
+        fila["PUERTOS HABILITADOS"],
+    )
+
+def mostrar_correos(region):
+    """Muestra la lista de correos de la región indicada"""
+    #Comprobar region 
+    if (region=='R1'):
+        #leer Correo_R1.md
+        with open("correos/Correo_R1.md", "r") as archivo:
+            correos = archivo.read()
+            print(f"\n---Correos de R1---\n{correos}\n")
+    else:
+        #leer Correo_R2.md
+        with open("correos/Correo_R2.md", "r") as archivo:
+            correos = archivo.read()
+            print(f"\n---Correos de R2---\n{correos}\n")
+
+def lectura_data(ruta=RUTA_DATA):
     try:
-        df = pd.read_excel("data/data.xlsx", sheet_name="Liberacion")
+        df = leer_hoja("Liberacion", ruta)
         if df.empty:
             logging.error("El archivo no contiene datos")
             return None
         else:
             logging.info("Datos leídos correctamente")
-            #obtenemos las variables
-            hub = df["HUB"].iloc[0]
-            proveedor=df["PROVEEDOR"].iloc[0]
-            hostname = df["HOSTNAME"].iloc[0]
-            tipo_red = df["TIPO DE RED"].iloc[0]
-            tipo_zona = df["TIPO DE ZONA"].iloc[0]
-            tipo_cobertura=df["TIPO DE COBERTURA"].iloc[0]
-            region=df["REGIÓN"].iloc[0]
-            zona=df["ZONA"].iloc[0]
-            parroquia=df["PARROQUIA"].iloc[0]
-            feeder=df["FEEDER"].iloc[0]
-            cluster=df["CLUSTER"].iloc[0]
-            horizontal_residencial=df["Horizontal Residencial (HPs)"].iloc[0]
-            horizontal_comercial=df["Horizontal Comercial (HPs)"].iloc[0]
-            vertical_residencial=df["Vertical Residencial (HPs)"].iloc[0]
-            vertical_comercial=df["Vertical Comercial (HPs)"].iloc[0]
-            cantidad_edficios_proyectados=df["Cantidad de Edificios Proyectados"].iloc[0]
-            edificio_residencial_proyectado=df["Edif Resid Proyectados (HPs)"].iloc[0]
-            edificio_comercial_proyectado=df["Edif Comercial Proyectados (HPs)"].iloc[0]
-            solares=df["Solares"].iloc[0]
-            hp_total=df["HP'S TOTALES"].iloc[0]
-            puertos_habilitados=df["PUERTOS HABILITADOS"].iloc[0]
-            #Comprobar region 
-            if (region=='R1'):
-                #leer Correo_R1.md
-                with open("correos/Correo_R1.md", "r") as archivo:
-                    correos = archivo.read()
-                    print(f"\n---Correos de R1---\n{correos}\n")
-            else:
-                #leer Correo_R2.md
-                with open("correos/Correo_R2.md", "r") as archivo:
-                    correos = archivo.read()
-                    print(f"\n---Correos de R2---\n{correos}\n")
-            return hub, proveedor, hostname, tipo_red, tipo_zona, tipo_cobertura, region, zona, parroquia, feeder, cluster, horizontal_residencial, horizontal_comercial, vertical_residencial, vertical_comercial, cantidad_edficios_proyectados, edificio_residencial_proyectado, edificio_comercial_proyectado, solares, hp_total, puertos_habilitados
+            #obtenemos los datos de la primera fila
+            espec = EspecCluster.desde_fila(df.iloc[0])
+            mostrar_correos(espec.region)
+            return espec
     except Exception as e:
         logging.error(f"Error al leer el archivo: {e}")
         return None
 
-def inicializar_variables_globales():
-    global HUB, PROVEEDOR, HOSTNAME, TIPO_DE_RED, TIPO_DE_ZONA, TIPO_DE_COBERTURA 
-    global REGION, ZONA, PARROQUIA, FEEDER, CLUSTER
-    global HORIZONTAL_RESIDENCIAL_HPs, HORIZONTAL_COMERCIAL_HPs
-    global VERTICAL_RESIDENCIAL_HPs, VERTICAL_COMERCIAL_HPs
-    global CANTIDAD_EDIFICIOS_PROYECTADOS, EDIF_RESID_PROYECTADOS_HPs
-    global EDIF_COMERCIAL_PROYECTADOS_HPs, SOLARES, HPs_TOTALES, PUERTOS_HABILITADOS
-    global HOME_PASSES_TOTAL, BUSINESS_PASSES_TOTAL
-    
-    resultado = lectura_data()
-    if not resultado:
-        logging.error("No se pudieron inicializar las variables globales")
-        return False
-        
-    (HUB, PROVEEDOR, HOSTNAME, TIPO_DE_RED, TIPO_DE_ZONA, TIPO_DE_COBERTURA,
-     REGION, ZONA, PARROQUIA, FEEDER, CLUSTER, HORIZONTAL_RESIDENCIAL_HPs,
-     HORIZONTAL_COMERCIAL_HPs, VERTICAL_RESIDENCIAL_HPs, VERTICAL_COMERCIAL_HPs,
-     CANTIDAD_EDIFICIOS_PROYECTADOS, EDIF_RESID_PROYECTADOS_HPs,
-     EDIF_COMERCIAL_PROYECTADOS_HPs, SOLARES, HPs_TOTALES, PUERTOS_HABILITADOS) = resultado
-    
-    # Calcular los totales de home passes y business passes
-    HOME_PASSES_TOTAL = HPs_TOTALES - HORIZONTAL_COMERCIAL_HPs - VERTICAL_COMERCIAL_HPs
-    BUSINESS_PASSES_TOTAL = HORIZONTAL_COMERCIAL_HPs + VERTICAL_COMERCIAL_HPs
-    
-    return True
+def lectura_data_lote(ruta=RUTA_DATA):
+    """Lee todas las filas de la hoja 'Liberacion' para procesarlas en un solo paso"""
+    try:
+        df = leer_hoja("Liberacion", ruta)
+        # Ignorar filas sin cluster (filas vacías al final de la hoja)
+        df = df[df["CLUSTER"].notna()]
+        if df.empty:
+            logging.error("El archivo no contiene datos")
+            return None
+        logging.info(f"Se leyeron {len(df)} clusters de la hoja Liberacion")
+        return [EspecCluster.desde_fila(fila) for _, fila in df.iterrows()]
+    except Exception as e:
+        logging.error(f"Error al leer el archivo: {e}")
+        return None
 
 # Corrección de la función id_hash_cluster() en Liberacion.py
-def id_hash_cluster():
+def id_hash_cluster(espec):
     """Genera un ID único para el cluster basado en la fecha actual y el nombre del cluster."""
     try:
         fecha_hoy = datetime.now().strftime("%Y%m%d")
-        cadena = f"{fecha_hoy}{CLUSTER}"
+        cadena = f"{fecha_hoy}{espec.cluster}"
         # Usar MD5 para mantener compatibilidad con lo mencionado en los comentarios
         id_hash = hashlib.md5(cadena.encode()).hexdigest()
         return id_hash
@@ -144,123 +135,312 @@ def id_hash_cluster():
         logging.error(f"Error al generar hash: {e}")
         # Generar un hash aleatorio como fallback
         return hashlib.md5(str(datetime.now().timestamp()).encode()).hexdigest()
-def prueba():
-    if not inicializar_variables_globales():
+def prueba(ruta=RUTA_DATA, dir_salida=DIR_GENERADOR, modo_alcance=MODO_PANDAS):
+    espec = lectura_data(ruta)
+    if espec is None:
         print("No se pudieron leer los datos")
-        return
+        return False
     
-    # Verificar si el cluster existe en la BD
+    if modo_alcance == MODO_STREAMING:
+        # El cursor del servidor decide la existencia con la primera fila
+        resultado = caso_existencia_streaming(espec, dir_salida)
+        if resultado is not None:
+            return resultado
+        return caso_liberacion(espec, dir_salida) is not None
+
+    if modo_alcance == MODO_SQL:
+        # PostgreSQL entrega solo la fila resumen; sin fila, el cluster no existe
+        resumenes = resumenes_alcance_sql([espec.cluster])
+        if resumenes is None:
+            return False
+        resumen = resumenes.get(str(espec.cluster))
+        if resumen:
+            return caso_existencia(espec, dir_salida=dir_salida, resumen=resumen)
+        return caso_liberacion(espec, dir_salida) is not None
+
+    # Una sola consulta decide la existencia y trae los registros del reporte
+    registros = consultar_cluster(espec.cluster)
+    if registros is None:
+        return False
+    if registros:
+        return caso_existencia(espec, registros, dir_salida)
+    return caso_liberacion(espec, dir_salida) is not None
+
+# Encabezados de la tabla clusters en el orden específico requerido
+ENCABEZADOS_ALCANCE = [
+    'id', 'hostname', 'nombre', 'zona_cobertura', 'canton',
+    'puertos_habilitados', 'hps_liberadas', 'home_passes',
+    'business_passes', 'fecha_liberacion', 'hp_horizontal_res',
+    'hp_horizontal_com', 'hp_vertical_res', 'hp_vertical_com',
+    'edif_res', 'edif_com', 'solares_res', 'tipo_cobertura',
+    'region', 'parroquia', 'observacion', 'tipo_red',
+    'fecha_liberacion_corp', 'tipo', 'tipo_zona'
+]
+
+# Campos numéricos que se suman para calcular la capacidad pendiente
+CAMPOS_NUMERICOS_ALCANCE = [
+    'puertos_habilitados', 'hps_liberadas', 'home_passes', 'business_passes',
+    'hp_horizontal_res', 'hp_horizontal_com', 'hp_vertical_res', 'hp_vertical_com',
+    'edif_res', 'edif_com', 'solares_res'
+]
+
+# Filas que trae el cursor del servidor en cada viaje en modo streaming
+TAMANO_ITER_ALCANCE = 2000
+
+# Solo las columnas del alcance, en el orden de ENCABEZADOS_ALCANCE (no depende del orden de la tabla)
+COLUMNAS_ALCANCE_SQL = ", ".join(ENCABEZADOS_ALCANCE)
+# Sentencia preparada en el servidor una vez por conexión del pool
+SENTENCIA_ALCANCE = "alcance_por_cluster"
+# Orden del historial de un cluster. Todas las consultas lo usan, así la "última fila" del alcance
+# (OLT, NAP, observación) es la misma en los modos pandas, streaming y SQL sin depender del plan de lectura
+ORDEN_HISTORIAL = "fecha_liberacion, id"
+CONSULTA_ALCANCE = f"SELECT {COLUMNAS_ALCANCE_SQL} FROM clusters WHERE nombre = $1 ORDER BY {ORDEN_HISTORIAL}"
+
+# Sumas y última fila (según ORDEN_HISTORIAL) de cada cluster calculadas en el servidor
+SENTENCIA_RESUMEN = "resumen_alcance_por_clusters"
+CONSULTA_RESUMEN = (
+    "SELECT * FROM ("
+    f"SELECT {COLUMNAS_ALCANCE_SQL}, "
+    + "".join(f"COALESCE(SUM({campo}) OVER w, 0) AS suma_{campo}, " for campo in CAMPOS_NUMERICOS_ALCANCE)
+    + "ROW_NUMBER() OVER w AS rn, COUNT(*) OVER w AS total, "
+    + "BOOL_OR(" + " OR ".join(f"{campo} IS NULL" for campo in CAMPOS_NUMERICOS_ALCANCE) + ") OVER w AS con_nulos "
+    "FROM clusters WHERE nombre = ANY($1) "
+    f"WINDOW w AS (PARTITION BY nombre ORDER BY {ORDEN_HISTORIAL} "
+    "ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)"
+    ") t WHERE rn = total"
+)
+
+# Historial de varios clusters agrupado por nombre, para recorrerlo con un cursor del servidor
+CONSULTA_HISTORIAL_CLUSTERS = (
+    f"SELECT {COLUMNAS_ALCANCE_SQL} FROM clusters WHERE nombre = ANY(%s) ORDER BY nombre, {ORDEN_HISTORIAL}"
+)
+
+def resumenes_alcance_sql(clusters):
+    """Calcula en PostgreSQL el resumen de alcance de cada cluster: {cluster: (sumas, última fila, cantidad)}.
+    Los clusters sin registros no aparecen. Retorna None si hubo errores."""
     conn = conexion_bd()
     if conn is None:
         logging.error("No se pudo conectar a la base de datos")
-        return
-    
+        return None
+
+    cursor = None
+    columnas = len(ENCABEZADOS_ALCANCE)
     try:
         cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM clusters WHERE nombre = '{CLUSTER}'")
-        existe_cluster = cursor.fetchone() is not None
-        
-        if existe_cluster:
-            caso_existencia()
-        else:
-            caso_liberacion()
+        conn.preparar(cursor, SENTENCIA_RESUMEN, CONSULTA_RESUMEN)
+        with metricas.etapa("resumen_alcance_sql", metricas.CONSULTA, clusters=len(clusters)) as registro:
+            cursor.execute(f"EXECUTE {SENTENCIA_RESUMEN} (%s)", ([str(cluster) for cluster in clusters],))
+            resumenes = {}
+            for fila in cursor.fetchall():
+                ultimo = dict(zip(ENCABEZADOS_ALCANCE, fila[:columnas]))
+                sumas = dict(zip(CAMPOS_NUMERICOS_ALCANCE, fila[columnas:columnas + len(CAMPOS_NUMERICOS_ALCANCE)]))
+                resumenes[ultimo["nombre"]] = (_sumas_como_pandas(sumas, fila[-1]), ultimo, fila[-2])
+            registro["filas"] = sum(resumen[2] for resumen in resumenes.values())
+        return resumenes
+    except Exception as e:
+        logging.error(f"Error al calcular el resumen de alcance: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def resumenes_alcance_streaming(clusters):
+    """Recorre con un cursor del servidor el historial de todos los clusters indicados, resumiendo
+    cada uno por bloques: {cluster: (sumas, última fila, cantidad)}. La memoria no crece con el historial.
+    Los clusters sin registros no aparecen. Retorna None si hubo errores."""
+    conn = conexion_bd()
+    if conn is None:
+        logging.error("No se pudo conectar a la base de datos")
+        return None
+
+    cursor = None
+    idx_nombre = ENCABEZADOS_ALCANCE.index("nombre")
+    try:
+        cursor = conn.cursor(name="alcance_clusters")
+        cursor.itersize = TAMANO_ITER_ALCANCE
+        with metricas.etapa("resumen_alcance_streaming", metricas.CONSULTA, clusters=len(clusters)) as registro:
+            cursor.execute(CONSULTA_HISTORIAL_CLUSTERS, ([str(cluster) for cluster in clusters],))
+            resumenes = {}
+            for nombre, filas in itertools.groupby(cursor, key=lambda fila: fila[idx_nombre]):
+                resumenes[nombre] = resumen_alcance_incremental(filas)
+            registro["filas"] = sum(resumen[2] for resumen in resumenes.values())
+        return resumenes
+    except Exception as e:
+        logging.error(f"Error al recorrer el historial de los clusters: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def consultar_cluster(cluster):
+    """Trae en un solo viaje los registros del cluster con la sentencia preparada.
+    Retorna la lista de filas (vacía si el cluster no existe) o None si hubo errores."""
+    conn = conexion_bd()
+    if conn is None:
+        logging.error("No se pudo conectar a la base de datos")
+        return None
+
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        conn.preparar(cursor, SENTENCIA_ALCANCE, CONSULTA_ALCANCE)
+        with metricas.etapa("historial_cluster", metricas.CONSULTA, cluster=str(cluster)) as registro:
+            cursor.execute(f"EXECUTE {SENTENCIA_ALCANCE} (%s)", (str(cluster),))
+            filas = cursor.fetchall()
+            registro["filas"] = len(filas)
+        return filas
     except Exception as e:
         logging.error(f"Error al consultar el cluster: {e}")
+        return None
     finally:
-        if conn:
+        if cursor:
             cursor.close()
-            conn.close()
+        conn.close()
+
+def resumen_alcance_pandas(datos):
+    """Resume los registros del cluster con pandas: (sumas, última fila, cantidad de registros)"""
+    # Crear DataFrame directamente con los encabezados correctos para evitar reindexación
+    df = pd.DataFrame(datos, columns=ENCABEZADOS_ALCANCE)
+    # Calcular sumas en una sola operación vectorizada
+    sumas = df[CAMPOS_NUMERICOS_ALCANCE].sum()
+    ultimo = df.iloc[-1] if not df.empty else None
+    return sumas, ultimo, len(df)
+
+def _sumas_como_pandas(sumas, con_nulos):
+    """En pandas un nulo en cualquier columna numérica pasa todas las sumas a float (la observación
+    dice '454.0'); los modos streaming y SQL aplican la misma regla para escribir el mismo alcance"""
+    if con_nulos:
+        return {campo: float(valor) for campo, valor in sumas.items()}
+    return sumas
+
+def resumen_alcance_incremental(filas):
+    """Resume los registros fila por fila sin materializarlos: (sumas, última fila, cantidad de registros)"""
+    indices = [ENCABEZADOS_ALCANCE.index(campo) for campo in CAMPOS_NUMERICOS_ALCANCE]
+    sumas = [0] * len(indices)
+    ultimo = None
+    total = 0
+    con_nulos = False
+    for fila in filas:
+        for posicion, indice in enumerate(indices):
+            # Igual que pandas, los valores nulos no suman
+            if fila[indice] is not None:
+                sumas[posicion] += fila[indice]
+            else:
+                con_nulos = True
+        ultimo = fila
+        total += 1
+    if ultimo is not None:
+        ultimo = dict(zip(ENCABEZADOS_ALCANCE, ultimo))
+    return _sumas_como_pandas(dict(zip(CAMPOS_NUMERICOS_ALCANCE, sumas)), con_nulos), ultimo, total
+
+def fila_alcance(espec, resumen):
+    """Fila del alcance: lo que declara la hoja menos lo ya liberado en la BD ('resumen' = sumas, última fila, cantidad)"""
+    sumas, ultimo_registro, _ = resumen
+    
+    # Construir fila de diferencias entre la hoja y la BD
+    hoy = date.today()
+    fecha_formateada = hoy.strftime('%Y-%m-%d')
+    
+    # Crear diccionario de totales directamente
+    hay_registros = ultimo_registro is not None
+    totales = {
+        'id': id_hash_cluster(espec),
+        'hostname': ultimo_registro['hostname'] if hay_registros else espec.hostname,
+        'nombre': ultimo_registro['nombre'] if hay_registros else espec.cluster,
+        'zona_cobertura': ultimo_registro['zona_cobertura'] if hay_registros else espec.zona,
+        'canton': ultimo_registro['canton'] if hay_registros else 'SAMBORONDON',
+        'tipo_cobertura': ultimo_registro['tipo_cobertura'] if hay_registros else espec.tipo_de_cobertura,
+        'region': ultimo_registro['region'] if hay_registros else espec.region,
+        'parroquia': ultimo_registro['parroquia'] if hay_registros else espec.parroquia,
+        'tipo_red': ultimo_registro['tipo_red'] if hay_registros else espec.tipo_de_red,
+        'tipo': ultimo_registro['tipo'] if hay_registros else 'N/A',
+        'tipo_zona': espec.tipo_de_zona,
+        'fecha_liberacion': fecha_formateada,
+        'fecha_liberacion_corp': fecha_formateada,
+        'puertos_habilitados': espec.puertos_habilitados - sumas['puertos_habilitados'],
+        'hps_liberadas': espec.hps_totales - sumas['hps_liberadas'],
+        'home_passes': espec.home_passes_total - sumas['home_passes'],
+        'business_passes': espec.business_passes_total - sumas['business_passes'],
+        'hp_horizontal_res': espec.horizontal_residencial_hps - sumas['hp_horizontal_res'],
+        'hp_horizontal_com': espec.horizontal_comercial_hps - sumas['hp_horizontal_com'],
+        'hp_vertical_res': espec.vertical_residencial_hps - sumas['hp_vertical_res'],
+        'hp_vertical_com': espec.vertical_comercial_hps - sumas['hp_vertical_com'],
+        'edif_res': espec.edif_resid_proyectados_hps - sumas['edif_res'],
+        'edif_com': espec.edif_comercial_proyectados_hps - sumas['edif_com'],
+        'solares_res': espec.solares - sumas['solares_res'],
+    }
+    
+    # Añadir observación
+    if hay_registros:
+        totales['observacion'] = f"{ultimo_registro['observacion']} - Pendiente: {totales['home_passes']} Home Passes"
+    else:
+        totales['observacion'] = f"Feeder: {espec.feeder}, Hub: {espec.hub}"
+    return totales
+
+def fila_liberacion(espec):
+    """Fila de liberación de un cluster nuevo, con los datos de la hoja y un ID único"""
+    fecha_formateada = date.today().strftime('%Y-%m-%d')
+    return {
+        'id': id_hash_cluster(espec),
+        'hostname': espec.hostname,
+        'nombre': espec.cluster,
+        'zona_cobertura': espec.zona,
+        'canton': 'SAMBORONDON',
+        'puertos_habilitados': espec.puertos_habilitados,
+        'hps_liberadas': espec.hps_totales,
+        'home_passes': espec.home_passes_total,
+        'business_passes': espec.business_passes_total,
+        'fecha_liberacion': fecha_formateada,
+        'hp_horizontal_res': espec.horizontal_residencial_hps,
+        'hp_horizontal_com': espec.horizontal_comercial_hps,
+        'hp_vertical_res': espec.vertical_residencial_hps,
+        'hp_vertical_com': espec.vertical_comercial_hps,
+        'edif_res': espec.edif_resid_proyectados_hps,
+        'edif_com': espec.edif_comercial_proyectados_hps,
+        'solares_res': espec.solares,
+        'tipo_cobertura': espec.tipo_de_cobertura,
+        'region': espec.region,
+        'parroquia': espec.parroquia,
+        'observacion': f"Feeder: {espec.feeder}, Hub: {espec.hub}",
+        'tipo_red': espec.tipo_de_red,
+        'fecha_liberacion_corp': fecha_formateada,
+        'tipo': 'N/A',
+        'tipo_zona': espec.tipo_de_zona
+    }
+
+def celdas_fila(fila):
+    """Valores de la fila en el orden de ENCABEZADOS_ALCANCE; los nulos de pandas quedan como celdas vacías"""
+    return [None if isinstance(fila[campo], float) and fila[campo] != fila[campo] else fila[campo]
+            for campo in ENCABEZADOS_ALCANCE]
+
+def escribir_libro_fila(ruta_archivo, hoja, fila):
+    """Escribe un libro de una sola fila con el encabezado en negrita"""
+    escritor = EscritorXlsx(ruta_archivo, ENCABEZADOS_ALCANCE, hoja=hoja)
+    escritor.escribir(celdas_fila(fila))
+    escritor.cerrar()
 
 #función para exportar excel
-def exportar_excel_alcance(datos, ruta_archivo=None):
-    """Exporta los datos de la consulta a un archivo Excel con mejor rendimiento"""
+def exportar_excel_alcance(espec, datos, ruta_archivo=None, dir_salida=DIR_GENERADOR, resumen=None):
+    """Exporta los datos de la consulta a un archivo Excel con mejor rendimiento.
+    Si se recibe 'resumen' (sumas, última fila, cantidad) no se vuelven a procesar los datos."""
     if ruta_archivo is None:
-        ruta_archivo = f"generador/alcance_{CLUSTER}.xlsx"
+        ruta_archivo = os.path.join(dir_salida, f"alcance_{espec.cluster}.xlsx")
         
     try:
         # Asegurar que el directorio existe
         os.makedirs(os.path.dirname(ruta_archivo), exist_ok=True)
 
-        # Definir los encabezados en el orden específico requerido
-        encabezados = [
-            'id', 'hostname', 'nombre', 'zona_cobertura', 'canton',
-            'puertos_habilitados', 'hps_liberadas', 'home_passes',
-            'business_passes', 'fecha_liberacion', 'hp_horizontal_res',
-            'hp_horizontal_com', 'hp_vertical_res', 'hp_vertical_com',
-            'edif_res', 'edif_com', 'solares_res', 'tipo_cobertura',
-            'region', 'parroquia', 'observacion', 'tipo_red',
-            'fecha_liberacion_corp', 'tipo', 'tipo_zona'
-        ]
-
-        # Crear DataFrame directamente con los encabezados correctos para evitar reindexación
-        df = pd.DataFrame(datos, columns=encabezados)
-        
-        # Calcular eficientemente totales numéricos usando vectorización pandas
-        campos_numericos = [
-            'puertos_habilitados', 'hps_liberadas', 'home_passes', 'business_passes',
-            'hp_horizontal_res', 'hp_horizontal_com', 'hp_vertical_res', 'hp_vertical_com',
-            'edif_res', 'edif_com', 'solares_res'
-        ]
+        # Calcular eficientemente totales numéricos y ubicar el último registro
+        if resumen is None:
+            with metricas.etapa("resumen_alcance", metricas.TRANSFORMACION, cluster=str(espec.cluster)) as registro:
+                resumen = resumen_alcance_pandas(datos)
+                registro["filas"] = resumen[2]
         
-        # Calcular sumas en una sola operación vectorizada
-        sumas = df[campos_numericos].sum()
-        
-        # Construir fila de diferencias entre variables globales y BD
-        hoy = date.today()
-        fecha_formateada = hoy.strftime('%Y-%m-%d')
-        
-        # Crear diccionario de totales directamente
-        totales = {
-            'id': id_hash_cluster(),
-            'hostname': df.iloc[-1]['hostname'] if not df.empty else HOSTNAME,
-            'nombre': df.iloc[-1]['nombre'] if not df.empty else CLUSTER,
-            'zona_cobertura': df.iloc[-1]['zona_cobertura'] if not df.empty else ZONA,
-            'canton': df.iloc[-1]['canton'] if not df.empty else 'SAMBORONDON',
-            'tipo_cobertura': df.iloc[-1]['tipo_cobertura'] if not df.empty else TIPO_DE_COBERTURA,
-            'region': df.iloc[-1]['region'] if not df.empty else REGION,
-            'parroquia': df.iloc[-1]['parroquia'] if not df.empty else PARROQUIA,
-            'tipo_red': df.iloc[-1]['tipo_red'] if not df.empty else TIPO_DE_RED,
-            'tipo': df.iloc[-1]['tipo'] if not df.empty else 'N/A',
-            'tipo_zona': TIPO_DE_ZONA,
-            'fecha_liberacion': fecha_formateada,
-            'fecha_liberacion_corp': fecha_formateada,
-            'puertos_habilitados': PUERTOS_HABILITADOS - sumas['puertos_habilitados'],
-            'hps_liberadas': HPs_TOTALES - sumas['hps_liberadas'],
-            'home_passes': HOME_PASSES_TOTAL - sumas['home_passes'],
-            'business_passes': BUSINESS_PASSES_TOTAL - sumas['business_passes'],
-            'hp_horizontal_res': HORIZONTAL_RESIDENCIAL_HPs - sumas['hp_horizontal_res'],
-            'hp_horizontal_com': HORIZONTAL_COMERCIAL_HPs - sumas['hp_horizontal_com'],
-            'hp_vertical_res': VERTICAL_RESIDENCIAL_HPs - sumas['hp_vertical_res'],
-            'hp_vertical_com': VERTICAL_COMERCIAL_HPs - sumas['hp_vertical_com'],
-            'edif_res': EDIF_RESID_PROYECTADOS_HPs - sumas['edif_res'],
-            'edif_com': EDIF_COMERCIAL_PROYECTADOS_HPs - sumas['edif_com'],
-            'solares_res': SOLARES - sumas['solares_res'],
-        }
-        
-        # Añadir observación
-        ultimo_registro = df.iloc[-1] if not df.empty else None
-        if ultimo_registro is not None:
-            totales['observacion'] = f"{ultimo_registro['observacion']} - Pendiente: {totales['home_passes']} Home Passes"
-        else:
-            totales['observacion'] = f"Feeder: {FEEDER}, Hub: {HUB}"
-        
-        # Crear DataFrame solo con la fila de totales (resultado final)
-        df_final = pd.DataFrame([totales])
-        
-        # Reordenar las columnas en el orden especificado
-        df_final = df_final[encabezados]
-        
-        # Usar context manager para asegurar cierre de recursos
-        with pd.ExcelWriter(ruta_archivo, engine='openpyxl') as writer:
-            df_final.to_excel(writer, index=False, sheet_name='Resultados')
-            
-            # Obtener la hoja de trabajo
-            worksheet = writer.sheets['Resultados']
-            
-            # Formatear fila de encabezados
-            negrita = Font(bold=True)
-            for col in range(1, len(encabezados) + 1):
-                worksheet.cell(row=1, column=col).font = negrita
+        with metricas.etapa("exportar_alcance", metricas.EXPORTACION, filas=1) as registro:
+            escribir_libro_fila(ruta_archivo, 'Resultados', fila_alcance(espec, resumen))
+            registro["bytes"] = metricas.tamano_archivo(ruta_archivo)
                 
         print(f"Archivo Excel exportado en {ruta_archivo}")
         return ruta_archivo
@@ -269,98 +449,77 @@ def exportar_excel_alcance(datos, ruta_archivo=None):
         print(f'Error al exportar a Excel: {str(e)}')
         return None
 
-def caso_existencia():
-    conexion = conexion_bd() # Conectar a la BD
-    if conexion is not None:
-        try:
-            cursor = conexion.cursor()
-            query = f"SELECT * FROM clusters WHERE nombre = '{CLUSTER}'"
-            cursor.execute(query)
-            result = cursor.fetchall()
-            if result:
-                print(f"Se encontraron {len(result)} registros para el cluster {CLUSTER}.")
-                # Exportar resultados a Excel
-                archivo = exportar_excel_alcance(result)
-                if archivo:
-                    print(f"Consulta el archivo {archivo} para ver los resultados detallados.")
-                return True
-            return False
-        except Exception as e:
-            print(f"Error en la consulta: {str(e)}")
-            return False
-        finally:
+def caso_existencia_streaming(espec, dir_salida=DIR_GENERADOR):
+    """Variante de caso_existencia que recorre el historial del cluster con un cursor del servidor,
+    acumulando los totales por bloques para que la memoria no crezca con el historial.
+    Retorna True si se exportó el alcance, False si hubo errores y None si el cluster no tiene registros."""
+    conexion = conexion_bd()
+    if conexion is None:
+        return False
+    cursor = None
+    try:
+        cursor = conexion.cursor(name="alcance_cluster")
+        cursor.itersize = TAMANO_ITER_ALCANCE
+        with metricas.etapa("historial_cluster_streaming", metricas.CONSULTA, cluster=str(espec.cluster)) as registro:
+            # Un cursor con nombre no admite EXECUTE: se declara con la misma proyección explícita
+            cursor.execute(f"SELECT {COLUMNAS_ALCANCE_SQL} FROM clusters WHERE nombre = %s ORDER BY {ORDEN_HISTORIAL}",
+                           (str(espec.cluster),))
+            primera = cursor.fetchone()
+            if primera is None:
+                registro["filas"] = 0
+                return None
+            resumen = resumen_alcance_incremental(itertools.chain([primera], cursor))
+            registro["filas"] = resumen[2]
+        print(f"Se encontraron {resumen[2]} registros para el cluster {espec.cluster}.")
+        archivo = exportar_excel_alcance(espec, None, dir_salida=dir_salida, resumen=resumen)
+        if archivo:
+            print(f"Consulta el archivo {archivo} para ver los resultados detallados.")
+        return True
+    except Exception as e:
+        print(f"Error en la consulta: {str(e)}")
+        return False
+    finally:
+        if cursor:
             cursor.close()
-            conexion.close()
-    return False
+        conexion.close()
+
+def caso_existencia(espec, registros=None, dir_salida=DIR_GENERADOR, modo_alcance=MODO_PANDAS, resumen=None):
+    # Normalmente los registros (o su resumen ya agregado) vienen consultados por prueba() o por el modo lote
+    if registros is not None or resumen is not None:
+        total = resumen[2] if resumen is not None else len(registros)
+        print(f"Se encontraron {total} registros para el cluster {espec.cluster}.")
+        archivo = exportar_excel_alcance(espec, registros, dir_salida=dir_salida, resumen=resumen)
+        if archivo:
+            print(f"Consulta el archivo {archivo} para ver los resultados detallados.")
+        return archivo is not None
+
+    if modo_alcance == MODO_STREAMING:
+        return bool(caso_existencia_streaming(espec, dir_salida))
+
+    if modo_alcance == MODO_SQL:
+        resumen = (resumenes_alcance_sql([espec.cluster]) or {}).get(str(espec.cluster))
+        if not resumen:
+            return False
+        return caso_existencia(espec, dir_salida=dir_salida, resumen=resumen)
+
+    registros = consultar_cluster(espec.cluster)
+    if not registros:
+        return False
+    return caso_existencia(espec, registros, dir_salida)
 
-def caso_liberacion():
+def caso_liberacion(espec, dir_salida=DIR_GENERADOR):
     """
     Función para crear un archivo Excel con datos de un nuevo cluster que no existe en la BD.
-    Usa las variables globales para llenar los campos y genera un ID único.
-    Versión optimizada para mejor rendimiento.
+    Usa los datos de 'espec' para llenar los campos y genera un ID único.
     """
     try:
-        # Generar ID y fecha una sola vez
-        id_cluster = id_hash_cluster()
-        fecha_formateada = date.today().strftime('%Y-%m-%d')
-        
         # Crear el directorio de salida de antemano
-        os.makedirs("generador", exist_ok=True)
-        ruta_archivo = f"generador/liberacion_{CLUSTER}.xlsx"
-        
-        # Crear un diccionario directamente con todos los datos necesarios
-        # Evita manipulaciones de listas intermedias
-        datos = {
-            'id': [id_cluster],
-            'hostname': [HOSTNAME],
-            'nombre': [CLUSTER],
-            'zona_cobertura': [ZONA],
-            'canton': ['SAMBORONDON'],
-            'puertos_habilitados': [PUERTOS_HABILITADOS],
-            'hps_liberadas': [HPs_TOTALES], 
-            'home_passes': [HOME_PASSES_TOTAL],
-            'business_passes': [BUSINESS_PASSES_TOTAL],
-            'fecha_liberacion': [fecha_formateada],
-            'hp_horizontal_res': [HORIZONTAL_RESIDENCIAL_HPs],
-            'hp_horizontal_com': [HORIZONTAL_COMERCIAL_HPs],
-            'hp_vertical_res': [VERTICAL_RESIDENCIAL_HPs],
-            'hp_vertical_com': [VERTICAL_COMERCIAL_HPs],
-            'edif_res': [EDIF_RESID_PROYECTADOS_HPs],
-            'edif_com': [EDIF_COMERCIAL_PROYECTADOS_HPs],
-            'solares_res': [SOLARES],
-            'tipo_cobertura': [TIPO_DE_COBERTURA],
-            'region': [REGION],
-            'parroquia': [PARROQUIA],
-            'observacion': [f"Feeder: {FEEDER}, Hub: {HUB}"],
-            'tipo_red': [TIPO_DE_RED],
-            'fecha_liberacion_corp': [fecha_formateada],
-            'tipo': ['N/A'],
-            'tipo_zona': [TIPO_DE_ZONA]
-        }
-        
-        # Crear DataFrame directamente con el orden correcto de columnas
-        columnas = [
-            'id', 'hostname', 'nombre', 'zona_cobertura', 'canton',
-            'puertos_habilitados', 'hps_liberadas', 'home_passes',
-            'business_passes', 'fecha_liberacion', 'hp_horizontal_res',
-            'hp_horizontal_com', 'hp_vertical_res', 'hp_vertical_com',
-            'edif_res', 'edif_com', 'solares_res', 'tipo_cobertura',
-            'region', 'parroquia', 'observacion', 'tipo_red',
-            'fecha_liberacion_corp', 'tipo', 'tipo_zona'
-        ]
+        os.makedirs(dir_salida, exist_ok=True)
+        ruta_archivo = os.path.join(dir_salida, f"liberacion_{espec.cluster}.xlsx")
         
-        # Crear DataFrame directamente con las columnas ordenadas
-        df = pd.DataFrame(datos)[columnas]
-        
-        # Usar un contexto más simple para escribir en Excel
-        with pd.ExcelWriter(ruta_archivo, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Liberación')
-            
-            # Aplicar formato negrita solo a los encabezados
-            worksheet = writer.sheets['Liberación']
-            negrita = Font(bold=True)
-            for col in range(1, len(columnas) + 1):
-                worksheet.cell(row=1, column=col).font = negrita
+        with metricas.etapa("exportar_liberacion", metricas.EXPORTACION, filas=1) as registro:
+            escribir_libro_fila(ruta_archivo, 'Liberación', fila_liberacion(espec))
+            registro["bytes"] = metricas.tamano_archivo(ruta_archivo)
         
         logging.info(f"Archivo de liberación creado en {ruta_archivo}")
         return ruta_archivo
@@ -369,8 +528,133 @@ def caso_liberacion():
         logging.error(f"Error en caso_liberación: {str(e)}")
         return None
 
-def main():
-    prueba()
+# Modos en los que el lote recibe ya el resumen de cada cluster en lugar de sus filas
+RESUMEN_EN_LOTE = (MODO_SQL, MODO_STREAMING)
+
+# Hojas del libro consolidado
+HOJA_LIBERACION = "Liberación"
+HOJA_ALCANCE = "Alcance"
+
+def exportar_consolidado(especs, existentes, dir_salida=DIR_GENERADOR, modo_alcance=MODO_PANDAS):
+    """Escribe en un solo libro, en una sola pasada, la fila de cada cluster: los nuevos en la hoja
+    'Liberación' y los que ya tienen historial en 'Alcance'. Retorna la ruta del libro o None si hubo errores.
+    'existentes' es {cluster: filas} o, en modos SQL y streaming, {cluster: resumen}."""
+    ruta_archivo = os.path.join(dir_salida, f"liberacion_consolidada_{date.today().strftime('%Y-%m-%d')}.xlsx")
+    try:
+        os.makedirs(dir_salida, exist_ok=True)
+        escritor = EscritorXlsxHojas(ruta_archivo, {HOJA_LIBERACION: ENCABEZADOS_ALCANCE,
+                                                    HOJA_ALCANCE: ENCABEZADOS_ALCANCE})
+        nuevos = con_alcance = 0
+        with metricas.etapa("exportar_consolidado", metricas.EXPORTACION) as registro:
+            for espec in especs:
+                existente = existentes.get(str(espec.cluster))
+                if existente:
+                    resumen = existente if modo_alcance in RESUMEN_EN_LOTE else resumen_alcance_pandas(existente)
+                    escritor.escribir(HOJA_ALCANCE, celdas_fila(fila_alcance(espec, resumen)))
+                    con_alcance += 1
+                else:
+                    escritor.escribir(HOJA_LIBERACION, celdas_fila(fila_liberacion(espec)))
+                    nuevos += 1
+            escritor.cerrar()
+            registro["filas"] = nuevos + con_alcance
+            registro["bytes"] = metricas.tamano_archivo(ruta_archivo)
+    except Exception as e:
+        logging.error(f"Error al exportar el libro consolidado: {e}")
+        return None
+
+    print(f"Libro consolidado exportado en {ruta_archivo} ({nuevos} clusters nuevos, {con_alcance} con alcance)")
+    return ruta_archivo
+
+def consultar_clusters_existentes(clusters):
+    """Consulta en una sola ida a la BD los registros de todos los clusters indicados.
+    Retorna un diccionario {cluster: [filas]} solo con los clusters que existen."""
+    conn = conexion_bd()
+    if conn is None:
+        logging.error("No se pudo conectar a la base de datos")
+        return None
+
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        with metricas.etapa("clusters_existentes", metricas.CONSULTA, clusters=len(clusters)) as registro:
+            cursor.execute(f"SELECT {COLUMNAS_ALCANCE_SQL} FROM clusters WHERE nombre = ANY(%s) "
+                           f"ORDER BY nombre, {ORDEN_HISTORIAL}", (list(clusters),))
+            idx_nombre = ENCABEZADOS_ALCANCE.index("nombre")
+            registros = {}
+            filas = cursor.fetchall()
+            for fila in filas:
+                registros.setdefault(fila[idx_nombre], []).append(fila)
+            registro["filas"] = len(filas)
+        return registros
+    except Exception as e:
+        logging.error(f"Error al consultar los clusters: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def liberacion_lote(ruta=RUTA_DATA, dir_salida=DIR_GENERADOR, modo_alcance=MODO_PANDAS, consolidado=False):
+    """Procesa todas las filas de la hoja 'Liberacion' en una sola ejecución.
+    En modo SQL se traen solo los resúmenes y en modo streaming el historial se resume mientras se recorre
+    con un cursor del servidor; en modo pandas se trae el historial completo.
+    Con consolidado=True se genera un único libro en lugar de un archivo por cluster."""
+    especs = lectura_data_lote(ruta)
+    if not especs:
+        print("No se pudieron leer los datos")
+        return False
+
+    # Una sola consulta para decidir existencia y obtener el historial de cada cluster
+    clusters = list(dict.fromkeys(str(espec.cluster) for espec in especs))
+    if modo_alcance == MODO_SQL:
+        existentes = resumenes_alcance_sql(clusters)
+    elif modo_alcance == MODO_STREAMING:
+        existentes = resumenes_alcance_streaming(clusters)
+    else:
+        existentes = consultar_clusters_existentes(clusters)
+    if existentes is None:
+        return False
+
+    # Mostrar los correos una vez por región involucrada
+    for region in dict.fromkeys(espec.region for espec in especs):
+        mostrar_correos(region)
+
+    if consolidado:
+        return exportar_consolidado(especs, existentes, dir_salida, modo_alcance) is not None
+
+    procesados = 0
+    for espec in especs:
+        existente = existentes.get(str(espec.cluster))
+        if existente and modo_alcance in RESUMEN_EN_LOTE:
+            resultado = caso_existencia(espec, dir_salida=dir_salida, resumen=existente)
+        elif existente:
+            resultado = caso_existencia(espec, existente, dir_salida)
+        else:
+            resultado = caso_liberacion(espec, dir_salida)
+        if resultado:
+            procesados += 1
+
+    print(f"Clusters procesados: {procesados} de {len(especs)} "
+          f"({sum(1 for c in clusters if c in existentes)} existentes, "
+          f"{sum(1 for c in clusters if c not in existentes)} nuevos)")
+    return procesados == len(especs)
+
+def main(lote=False, ruta_entrada=RUTA_DATA, dir_salida=DIR_GENERADOR, streaming=False, modo_alcance=None,
+         consolidado=False):
+    """Ejecuta la liberación; retorna True si terminó correctamente.
+    streaming=True equivale a modo_alcance=MODO_STREAMING; consolidado=True implica el modo lote."""
+    if modo_alcance is None:
+        modo_alcance = MODO_STREAMING if streaming else MODO_PANDAS
+    if lote or consolidado:
+        return liberacion_lote(ruta_entrada, dir_salida, modo_alcance, consolidado)
+    return prueba(ruta_entrada, dir_salida, modo_alcance)
 
 if __name__ == "__main__":
-    main()
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main(lote="--lote" in sys.argv[1:], streaming="--streaming" in sys.argv[1:],
+         modo_alcance=MODO_SQL if "--sql" in sys.argv[1:] else None,
+         consolidado="--consolidado" in sys.argv[1:])
@@ -0,0 +1,256 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+import psycopg2
+from psycopg2 import extensions
+
+import metricas
+
+# La variable de entorno permite apuntar a otra base (por ejemplo la local de benchmarks)
+RUTA_CONFIGURACION = os.environ.get("LIBERACION_CONEXION", "configuracion/conexion.json")
+
+# Valores por defecto del pool (se pueden sobrescribir en la sección "Pool" de conexion.json)
+POOL_MINIMO = 1
+POOL_MAXIMO = 5
+TIEMPO_INACTIVIDAD = 300  # segundos antes de cerrar una conexión ociosa
+VERIFICAR_DESPUES = 30    # segundos de inactividad a partir de los cuales se hace ping al entregarla
+TIEMPO_ESPERA = 30        # segundos máximos esperando una conexión libre
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def leer_configuracion(ruta=RUTA_CONFIGURACION):
+    """Lee el archivo de configuración una sola vez por proceso"""
+    with open(ruta, "r") as archivo:
+        return json.load(archivo)
+
+
+class ConexionPool:
+    """Envoltura de una conexión del pool: close() la devuelve al pool en lugar de cerrarla"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def preparar(self, cursor, nombre, sentencia):
+        """Ejecuta PREPARE solo la primera vez en esta conexión física; la sentencia sigue
+        disponible cuando la conexión vuelve al pool y se entrega de nuevo"""
+        preparadas = self._pool.preparadas(self._conn)
+        if nombre not in preparadas:
+            cursor.execute(f"PREPARE {nombre} AS {sentencia}")
+            preparadas.add(nombre)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.devolver(self._conn)
+            self._conn = None
+
+
+class PoolConexiones:
+    """Pool de conexiones PostgreSQL con creación perezosa, expiración por inactividad y verificación al entregar"""
+
+    def __init__(self, parametros, minimo=POOL_MINIMO, maximo=POOL_MAXIMO,
+                 tiempo_inactividad=TIEMPO_INACTIVIDAD, verificar_despues=VERIFICAR_DESPUES):
+        self.parametros = parametros
+        self.minimo = minimo
+        self.maximo = maximo
+        self.tiempo_inactividad = tiempo_inactividad
+        self.verificar_despues = verificar_despues
+        self._libres = []  # lista de (conexion, instante_de_devolucion)
+        self._en_uso = 0
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        # Sentencias preparadas en cada conexión física: {id(conexion): {nombre}}
+        self._preparadas = {}
+
+    def _crear(self):
+        with metricas.etapa("conexion_bd", metricas.CONEXION, host=self.parametros.get("host")):
+            conn = psycopg2.connect(**self.parametros)
+        logging.info("Conexión exitosa a la base de datos")
+        return conn
+
+    def _saludable(self, conn, inactiva):
+        """Comprueba que la conexión siga viva antes de entregarla"""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if inactiva < self.verificar_despues:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def preparadas(self, conn):
+        with self._condicion:
+            return self._preparadas.setdefault(id(conn), set())
+
+    def _descartar(self, conn):
+        """Cierra una conexión que ya salió del pool; se llama sin tener el lock tomado"""
+        with self._condicion:
+            self._preparadas.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def obtener(self, tiempo_espera=TIEMPO_ESPERA):
+        """Entrega una conexión libre y sana, creando una nueva si hay cupo"""
+        limite = time.monotonic() + tiempo_espera
+        while True:
+            candidata = None
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise psycopg2.InterfaceError("El pool de conexiones está cerrado")
+                    ahora = time.monotonic()
+                    if self._libres:
+                        candidata, devuelta = self._libres.pop()
+                        # El cupo queda reservado mientras se verifica la conexión fuera del lock
+                        self._en_uso += 1
+                        break
+                    if self._en_uso < self.maximo:
+                        self._en_uso += 1
+                        break
+                    restante = limite - ahora
+                    if restante <= 0:
+                        raise psycopg2.OperationalError("No hay conexiones libres en el pool")
+                    self._condicion.wait(restante)
+            if candidata is None:
+                break
+
+            # El ping (SELECT 1) y el cierre son viajes de red: se hacen sin bloquear al resto del pool
+            inactiva = time.monotonic() - devuelta
+            if inactiva <= self.tiempo_inactividad and self._saludable(candidata, inactiva):
+                return candidata
+            self._descartar(candidata)
+            with self._condicion:
+                self._en_uso -= 1
+                self._condicion.notify()
+
+        # Crear la conexión fuera del lock: el handshake TCP + autenticación es lento
+        try:
+            conn = self._crear()
+        except Exception:
+            with self._condicion:
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+        self._rellenar()
+        return conn
+
+    def _rellenar(self):
+        """Mantiene al menos 'minimo' conexiones abiertas entre usadas y libres"""
+        while True:
+            with self._condicion:
+                if self._cerrado or self._en_uso + len(self._libres) >= self.minimo:
+                    return
+            try:
+                conn = self._crear()
+            except psycopg2.Error:
+                return
+            with self._condicion:
+                self._libres.append((conn, time.monotonic()))
+                self._condicion.notify()
+
+    def devolver(self, conn):
+        """Regresa la conexión al pool, deshaciendo cualquier transacción pendiente"""
+        descartar = False
+        try:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            descartar = True
+        with self._condicion:
+            self._en_uso -= 1
+            descartar = descartar or conn.closed or self._cerrado
+            if not descartar:
+                self._libres.append((conn, time.monotonic()))
+            self._condicion.notify()
+        if descartar:
+            self._descartar(conn)
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._condicion.notify_all()
+        for conn, _ in libres:
+            self._descartar(conn)
+
+
+def obtener_pool():
+    """Crea el pool la primera vez que se necesita y lo reutiliza después"""
+    global _pool
+    if _pool is None:
+        with _lock_pool:
+            if _pool is None:
+                configuracion = leer_configuracion()
+                credenciales = configuracion["PostgresSQL"]
+                opciones = configuracion.get("Pool", {})
+                _pool = PoolConexiones(
+                    parametros={
+                        "dbname": credenciales["database"],
+                        "user": credenciales["user"],
+                        "password": credenciales["password"],
+                        "host": credenciales["host"],
+                        "port": credenciales["port"],
+                    },
+                    minimo=opciones.get("minimo", POOL_MINIMO),
+                    maximo=opciones.get("maximo", POOL_MAXIMO),
+                    tiempo_inactividad=opciones.get("inactividad", TIEMPO_INACTIVIDAD),
+                    verificar_despues=opciones.get("verificar_despues", VERIFICAR_DESPUES),
+                )
+    return _pool
+
+
+def cerrar_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
+
+
+atexit.register(cerrar_pool)
+
+# Pools heredados de un fork: se mantienen referenciados para que el recolector no cierre
+# (y con ello termine en el servidor) las conexiones que siguen siendo del proceso padre
+_pools_heredados = []
+
+
+def _reiniciar_tras_fork():
+    """En el proceso hijo se empieza con un pool vacío propio"""
+    global _pool, _lock_pool
+    if _pool is not None:
+        _pools_heredados.append(_pool)
+    _pool = None
+    _lock_pool = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
+
+
+def conexion_bd():
+    """Obtiene una conexión del pool compartido; close() la devuelve al pool"""
+    try:
+        pool = obtener_pool()
+        return ConexionPool(pool, pool.obtener())
+    except Exception as e:
+        logging.error(f"Error al conectar a la base de datos: {e}")
+        return None
@@ -0,0 +1,133 @@
+"""Prepara una base PostgreSQL local que reemplaza a la remota durante los benchmarks.
+
+Crea las tablas 'clusters' e 'inv_naps' y las llena a partir de un libro sintético:
+una fracción de los NAPs del libro queda registrada en inv_naps y una fracción de los
+clusters tiene historial de liberaciones.
+
+Uso (con un PostgreSQL local, por ejemplo: docker run -e POSTGRES_PASSWORD=bench -p 5433:5432 postgres:16):
+    python benchmarks/base_local.py --libro benchmarks/datos/data_100000.xlsx
+
+Como borra y recrea las tablas, siempre usa benchmarks/conexion_local.json (u otro archivo dado con
+--conexion); ignora LIBERACION_CONEXION y nunca se conecta con configuracion/conexion.json.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CONEXION_LOCAL = os.path.join(RAIZ, "benchmarks", "conexion_local.json")
+CONEXION_PRODUCCION = os.path.join(RAIZ, "configuracion", "conexion.json")
+
+DDL = """
+DROP TABLE IF EXISTS clusters;
+DROP TABLE IF EXISTS inv_naps;
+CREATE TABLE clusters (
+    id text, hostname text, nombre text, zona_cobertura text, canton text,
+    puertos_habilitados integer, hps_liberadas integer, home_passes integer,
+    business_passes integer, fecha_liberacion date, hp_horizontal_res integer,
+    hp_horizontal_com integer, hp_vertical_res integer, hp_vertical_com integer,
+    edif_res integer, edif_com integer, solares_res integer, tipo_cobertura text,
+    region text, parroquia text, observacion text, tipo_red text,
+    fecha_liberacion_corp date, tipo text, tipo_zona text
+);
+CREATE INDEX idx_clusters_nombre ON clusters (nombre);
+CREATE TABLE inv_naps (
+    hub text, cluster text, olt text, frame integer, slot integer, puerto integer,
+    nap text PRIMARY KEY, puertos_nap integer, coordenadas text, fecha_de_liberacion date,
+    region text, zona text, latitud text, longitud text
+);
+CREATE INDEX idx_inv_naps_cluster ON inv_naps (cluster);
+"""
+
+
+def _copiar(cursor, tabla, filas):
+    """Carga las filas con COPY en formato CSV"""
+    buffer = io.StringIO()
+    pd.DataFrame(filas).to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabla} FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def filas_inv_naps(naps, fraccion, aleatorio):
+    for nap in naps.to_dict("records"):
+        if aleatorio.random() < fraccion:
+            yield (nap["HUB"], nap["CLUSTER"], nap["OLT"], nap["FRAME"], nap["SLOT"], nap["PUERTO"],
+                   nap["CODIGO_NAP"], int(nap["# PUERTOS NAP"]),
+                   f"({nap['LONGITUD']:.6f}, {nap['LATITUD']:.6f})", "2025-01-01", "R2", "ZONA SINTETICA",
+                   f"{nap['LATITUD']:.6f}".replace(".", ","), f"{nap['LONGITUD']:.6f}".replace(".", ","))
+
+
+def filas_clusters(liberacion, fraccion, historial, aleatorio):
+    for fila in liberacion.to_dict("records"):
+        if aleatorio.random() >= fraccion:
+            continue
+        for numero in range(historial):
+            yield (f"hist{numero}_{fila['CLUSTER']}", fila["HOSTNAME"], fila["CLUSTER"], fila["ZONA"],
+                   "SAMBORONDON", aleatorio.randint(1, 20), aleatorio.randint(1, 50), aleatorio.randint(1, 40),
+                   aleatorio.randint(0, 5), "2025-01-01", aleatorio.randint(0, 10), aleatorio.randint(0, 2),
+                   aleatorio.randint(0, 10), aleatorio.randint(0, 2), aleatorio.randint(0, 3),
+                   aleatorio.randint(0, 1), aleatorio.randint(0, 5), fila["TIPO DE COBERTURA"], fila["REGIÓN"],
+                   fila["PARROQUIA"], f"Liberación {numero}", fila["TIPO DE RED"], "2025-01-01", "N/A",
+                   fila["TIPO DE ZONA"])
+
+
+def usar_conexion(ruta):
+    """Fija el archivo de conexión antes de importar base_datos (que lo lee al importarse).
+    Rechaza la configuración de producción: sembrar() borra las tablas y ejecutar.py no debe medir contra ella."""
+    ruta = os.path.realpath(ruta)
+    if not os.path.isfile(ruta):
+        raise SystemExit(f"No existe el archivo de conexión {ruta}")
+    if os.path.exists(CONEXION_PRODUCCION) and os.path.samefile(ruta, CONEXION_PRODUCCION):
+        raise SystemExit("Los benchmarks no pueden usar configuracion/conexion.json (la base de producción)")
+    os.environ["LIBERACION_CONEXION"] = ruta
+
+
+def sembrar(libro, fraccion_naps=0.9, fraccion_clusters=0.5, historial=20, semilla=1234):
+    from base_datos import RUTA_CONFIGURACION, conexion_bd
+    if RUTA_CONFIGURACION != os.environ.get("LIBERACION_CONEXION"):
+        raise SystemExit("La conexión no se fijó con usar_conexion(); no se modificará ninguna base")
+    aleatorio = random.Random(semilla)
+    naps = pd.read_excel(libro, sheet_name="Naps")
+    liberacion = pd.read_excel(libro, sheet_name="Liberacion")
+    conn = conexion_bd()
+    if conn is None:
+        raise SystemExit("No se pudo conectar a la base local")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(DDL)
+        _copiar(cursor, "inv_naps", filas_inv_naps(naps, fraccion_naps, aleatorio))
+        _copiar(cursor, "clusters", filas_clusters(liberacion, fraccion_clusters, historial, aleatorio))
+        cursor.execute("ANALYZE clusters")
+        cursor.execute("ANALYZE inv_naps")
+        conn.commit()
+        cursor.execute("SELECT (SELECT count(*) FROM inv_naps), (SELECT count(*) FROM clusters)")
+        total_naps, total_clusters = cursor.fetchone()
+        print(f"Base local lista: {total_naps} filas en inv_naps, {total_clusters} en clusters")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Siembra la base PostgreSQL local de benchmarks")
+    parser.add_argument("--libro", required=True, help="Libro sintético generado con generar_datos.py")
+    parser.add_argument("--conexion", default=CONEXION_LOCAL,
+                        help="Archivo de conexión de la base local (por defecto: benchmarks/conexion_local.json)")
+    parser.add_argument("--fraccion-naps", type=float, default=0.9,
+                        help="Fracción de NAPs del libro que ya existen en inv_naps")
+    parser.add_argument("--fraccion-clusters", type=float, default=0.5,
+                        help="Fracción de clusters con historial en la tabla clusters")
+    parser.add_argument("--historial", type=int, default=20, help="Liberaciones previas por cluster existente")
+    parser.add_argument("--semilla", type=int, default=1234)
+    args = parser.parse_args()
+    usar_conexion(args.conexion)
+    sembrar(args.libro, args.fraccion_naps, args.fraccion_clusters, args.historial, args.semilla)
+
+
+if __name__ == "__main__":
+    main()
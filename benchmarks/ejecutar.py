@@ -0,0 +1,181 @@
+"""Mide tiempo y memoria pico de cada etapa y guarda un reporte JSON comparable entre commits.
+
+Uso (desde la raíz del repositorio, con la base local sembrada por base_local.py):
+    export LIBERACION_CONEXION=benchmarks/conexion_local.json
+    python benchmarks/ejecutar.py --libro benchmarks/datos/data_100000.xlsx
+    python benchmarks/ejecutar.py --comparar benchmarks/resultados/A.json benchmarks/resultados/B.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import base_local  # noqa: E402  (mismo directorio que este script)
+import Inventario_naps  # noqa: E402
+import Liberacion  # noqa: E402
+import cache_regiones  # noqa: E402
+import lector_excel  # noqa: E402
+from base_datos import conexion_bd  # noqa: E402
+
+DIR_RESULTADOS = os.path.join("benchmarks", "resultados")
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def preparar_liberacion(libro):
+    """Elige el primer cluster con historial para medir exportar_excel_alcance: (espec, registros)"""
+    especs = Liberacion.lectura_data_lote(libro)
+    existentes = Liberacion.consultar_clusters_existentes([str(espec.cluster) for espec in especs]) or {}
+    for espec in especs:
+        if str(espec.cluster) in existentes:
+            return espec, existentes[str(espec.cluster)]
+    return especs[0], []
+
+
+def etapas(libro, salida):
+    """Etapas medidas: nombre -> función sin argumentos"""
+    espec, registros = preparar_liberacion(libro)
+    return {
+        "lectura_naps": lambda: Inventario_naps.lectura_naps_tabla(libro),
+        "busqueda_naps_bd": lambda: Inventario_naps.busqueda_naps_bd(("xlsx",), libro, salida, incremental=False),
+        "exportar_excel_alcance": lambda: Liberacion.exportar_excel_alcance(espec, registros, dir_salida=salida),
+        "caso_liberacion": lambda: Liberacion.caso_liberacion(espec, salida),
+        "liberacion_lote": lambda: Liberacion.liberacion_lote(libro, salida),
+    }
+
+
+def limpiar_caches(usar_cache, temporal):
+    lector_excel.limpiar_cache_memoria()
+    Inventario_naps.get_region_zone_from_db.cache_clear()
+    if not usar_cache:
+        # Una carpeta nueva por medición: la caché Parquet nunca está disponible.
+        # La de la medición anterior se borra para no acumular un Parquet por repetición.
+        if os.path.dirname(lector_excel.DIR_CACHE) == temporal:
+            shutil.rmtree(lector_excel.DIR_CACHE, ignore_errors=True)
+        lector_excel.DIR_CACHE = tempfile.mkdtemp(prefix="cache_", dir=temporal)
+        # Tampoco se reutilizan las regiones guardadas por la medición anterior (caché temporal de ejecutar())
+        cache_regiones.limpiar()
+
+
+def medir(funcion, repeticiones, usar_cache, temporal):
+    tiempos = []
+    for _ in range(repeticiones):
+        limpiar_caches(usar_cache, temporal)
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+
+    # La memoria pico se mide en una ejecución aparte porque tracemalloc altera los tiempos
+    limpiar_caches(usar_cache, temporal)
+    tracemalloc.start()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mediana_s": statistics.median(tiempos),
+        "minimo_s": min(tiempos),
+        "repeticiones": repeticiones,
+        "memoria_pico_mb": pico / (1024 * 1024),
+    }
+
+
+def ejecutar(libro, repeticiones, usar_cache, solo=None):
+    resultados = {}
+    ruta_regiones = cache_regiones.RUTA_CACHE
+    dir_cache = lector_excel.DIR_CACHE
+    # Salidas, cachés Parquet y caché de regiones de la ejecución viven en una carpeta que se borra al
+    # terminar; la caché de regiones temporal evita tocar data/.cache y sus contadores
+    with tempfile.TemporaryDirectory(prefix="bench_") as temporal:
+        salida = os.path.join(temporal, "salida")
+        os.makedirs(salida)
+        cache_regiones.RUTA_CACHE = os.path.join(temporal, "regiones.sqlite")
+        try:
+            for nombre, funcion in etapas(libro, salida).items():
+                if solo and nombre not in solo:
+                    continue
+                resultados[nombre] = medir(funcion, repeticiones, usar_cache, temporal)
+                print(f"{nombre:<24} {resultados[nombre]['mediana_s']:>9.3f} s  "
+                      f"{resultados[nombre]['memoria_pico_mb']:>9.1f} MB")
+        finally:
+            cache_regiones.RUTA_CACHE = ruta_regiones
+            lector_excel.DIR_CACHE = dir_cache
+    return {
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "libro": libro,
+        "tamano_libro_bytes": os.path.getsize(libro),
+        "cache_parquet": usar_cache,
+        "etapas": resultados,
+    }
+
+
+def comparar(ruta_a, ruta_b):
+    with open(ruta_a) as archivo:
+        a = json.load(archivo)
+    with open(ruta_b) as archivo:
+        b = json.load(archivo)
+    print(f"{'etapa':<24} {a['commit']:>12} {b['commit']:>12} {'cambio':>9}   memoria")
+    for nombre in a["etapas"]:
+        if nombre not in b["etapas"]:
+            continue
+        ta, tb = a["etapas"][nombre]["mediana_s"], b["etapas"][nombre]["mediana_s"]
+        ma, mb = a["etapas"][nombre]["memoria_pico_mb"], b["etapas"][nombre]["memoria_pico_mb"]
+        cambio = (tb - ta) / ta * 100 if ta else 0.0
+        print(f"{nombre:<24} {ta:>10.3f} s {tb:>10.3f} s {cambio:>+8.1f}%   {ma:.1f} -> {mb:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa de Liberacion e Inventario_naps")
+    parser.add_argument("--libro", help="Libro sintético generado con generar_datos.py")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--con-cache", action="store_true",
+                        help="Permitir la caché Parquet de lector_excel y la caché de regiones")
+    parser.add_argument("--etapa", nargs="+", help="Medir solo estas etapas")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTERIOR", "NUEVO"),
+                        help="Comparar dos reportes JSON")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    if not args.libro:
+        parser.error("--libro es obligatorio para ejecutar los benchmarks")
+    # Sin la variable base_datos usaría configuracion/conexion.json, es decir, la base de producción
+    ruta_conexion = os.environ.get("LIBERACION_CONEXION")
+    if not ruta_conexion:
+        raise SystemExit("Defina LIBERACION_CONEXION (por ejemplo benchmarks/conexion_local.json): "
+                         "sin ella los benchmarks consultarían la base de producción")
+    base_local.usar_conexion(ruta_conexion)
+    conn = conexion_bd()
+    if conn is None:
+        raise SystemExit("No se pudo conectar a la base (¿LIBERACION_CONEXION apunta a la base local?)")
+    conn.close()
+
+    reporte = ejecutar(args.libro, args.repeticiones, args.con_cache, args.etapa)
+    os.makedirs(DIR_RESULTADOS, exist_ok=True)
+    nombre = f"{reporte['commit']}_{os.path.splitext(os.path.basename(args.libro))[0]}_{time.strftime('%Y%m%d%H%M%S')}.json"
+    ruta = os.path.join(DIR_RESULTADOS, nombre)
+    with open(ruta, "w") as archivo:
+        json.dump(reporte, archivo, indent=2)
+    print(f"Reporte guardado en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Genera un data.xlsx sintético con las hojas 'Liberacion' y 'Naps' para los benchmarks.
+
+Uso:
+    python benchmarks/generar_datos.py --naps 100000 --clusters 50 --salida benchmarks/datos/data_100k.xlsx
+"""
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+
+ENCABEZADOS_LIBERACION = [
+    "HUB", "HOSTNAME", "PROVEEDOR", "TIPO DE RED", "TIPO DE ZONA", "TIPO DE COBERTURA", "REGIÓN",
+    "ZONA", "PARROQUIA", "FEEDER", "CLUSTER", "Horizontal Residencial (HPs)",
+    "Horizontal Comercial (HPs)", "Vertical Residencial (HPs)", "Vertical Comercial (HPs)",
+    "Cantidad de Edificios Proyectados", "Edif Resid Proyectados (HPs)",
+    "Edif Comercial Proyectados (HPs)", "Solares", "HP'S TOTALES", "PUERTOS HABILITADOS",
+]
+ENCABEZADOS_NAPS = ["HUB", "CLUSTER", "OLT", "FRAME", "SLOT", "PUERTO", "CODIGO_NAP",
+                    "# PUERTOS NAP", "LATITUD", "LONGITUD"]
+HUBS = ["DELICIAS", "CEIBOS", "SAMANES", "ALBORADA", "SAUCES", "URDESA"]
+
+
+def nombre_cluster(indice):
+    return f"B{indice // 100:01d}C{indice % 1000:03d}"
+
+
+def fila_liberacion(indice, aleatorio):
+    hub = HUBS[indice % len(HUBS)]
+    h_res, h_com = aleatorio.randint(0, 400), aleatorio.randint(0, 20)
+    v_res, v_com = aleatorio.randint(0, 400), aleatorio.randint(0, 20)
+    edif_res, edif_com = aleatorio.randint(0, 50), aleatorio.randint(0, 10)
+    solares = aleatorio.randint(0, 150)
+    return [
+        hub, f"OLT-ACC-{hub}-{indice % 4 + 1:02d}", "HUAWEI", "MASIVO", "CERRADA", "GREENFIELD",
+        "R1" if indice % 2 else "R2", f"ZONA SINTETICA {indice}", "SAMBORONDON", indice % 8 + 1,
+        nombre_cluster(indice), h_res, h_com, v_res, v_com, aleatorio.randint(0, 5), edif_res, edif_com,
+        solares, h_res + h_com + v_res + v_com + edif_res + edif_com + solares, aleatorio.randint(100, 800),
+    ]
+
+
+def fila_nap(indice, clusters, aleatorio):
+    cluster_idx = indice % clusters
+    latitud = -2.0 - cluster_idx * 0.01 - aleatorio.random() * 0.005
+    longitud = -79.8 - cluster_idx * 0.01 - aleatorio.random() * 0.005
+    return [
+        HUBS[cluster_idx % len(HUBS)], nombre_cluster(cluster_idx), f"OLT-ACC-{cluster_idx % 4 + 1:02d}",
+        0, aleatorio.randint(1, 16), aleatorio.randint(1, 16), f"BENCH_{cluster_idx:04d}_N{indice:07d}",
+        8.0, round(latitud, 5), round(longitud, 5),
+    ]
+
+
+def generar_libro(ruta, naps, clusters, semilla=1234):
+    """Escribe el libro en modo de solo escritura para poder llegar al millón de filas"""
+    aleatorio = random.Random(semilla)
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    libro = Workbook(write_only=True)
+    hoja_naps = libro.create_sheet("Naps")
+    hoja_naps.append(ENCABEZADOS_NAPS)
+    for indice in range(naps):
+        hoja_naps.append(fila_nap(indice, clusters, aleatorio))
+    hoja_liberacion = libro.create_sheet("Liberacion")
+    hoja_liberacion.append(ENCABEZADOS_LIBERACION)
+    for indice in range(clusters):
+        hoja_liberacion.append(fila_liberacion(indice, aleatorio))
+    libro.save(ruta)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un libro sintético para benchmarks")
+    parser.add_argument("--naps", type=int, default=1000, help="Filas de la hoja Naps (1k a 1M)")
+    parser.add_argument("--clusters", type=int, default=10, help="Filas de la hoja Liberacion")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--salida", default=None, help="Ruta del libro generado")
+    args = parser.parse_args()
+    salida = args.salida or os.path.join("benchmarks", "datos", f"data_{args.naps}.xlsx")
+    generar_libro(salida, args.naps, args.clusters, args.semilla)
+    print(f"Libro sintético generado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
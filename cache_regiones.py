@@ -0,0 +1,168 @@
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import metricas
+from base_datos import leer_configuracion
+
+RUTA_CACHE = os.path.join("data", ".cache", "regiones.sqlite")
+
+# Valores por defecto (se pueden cambiar en la sección "CacheRegiones" de conexion.json).
+# La región y zona de un cluster casi nunca cambian, así que la vigencia es larga.
+TTL_HORAS = 7 * 24
+MAX_ENTRADAS = 20000
+TAMANO_LOTE_CACHE = 500           # parámetros por consulta "IN (...)" en SQLite
+
+CONTADORES = ("aciertos", "fallos", "expirados", "desalojos")
+
+
+def configuracion():
+    """Retorna (activa, ttl_segundos, max_entradas) según conexion.json"""
+    try:
+        opciones = leer_configuracion().get("CacheRegiones", {})
+    except (OSError, ValueError):
+        opciones = {}
+    return (bool(opciones.get("activa", True)), float(opciones.get("ttl_horas", TTL_HORAS)) * 3600,
+            int(opciones.get("max_entradas", MAX_ENTRADAS)))
+
+
+def abrir_cache(ruta=None):
+    """Abre (y crea si no existe) la caché SQLite de región y zona por cluster.
+    En modo WAL varios procesos pueden leerla y escribirla a la vez."""
+    # La ruta se resuelve al llamar para poder redirigir la caché (por ejemplo en los benchmarks)
+    ruta = ruta or RUTA_CACHE
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS regiones (cluster TEXT PRIMARY KEY, region TEXT, zona TEXT, "
+        "guardado REAL NOT NULL, ultimo_uso REAL NOT NULL)"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_regiones_uso ON regiones (ultimo_uso)")
+    conexion.execute("CREATE TABLE IF NOT EXISTS contadores (nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+    return conexion
+
+
+def _sumar(conexion, **incrementos):
+    conexion.executemany(
+        "INSERT INTO contadores (nombre, valor) VALUES (?, ?) "
+        "ON CONFLICT (nombre) DO UPDATE SET valor = valor + excluded.valor",
+        [(nombre, valor) for nombre, valor in incrementos.items() if valor],
+    )
+
+
+def _lotes(valores):
+    for inicio in range(0, len(valores), TAMANO_LOTE_CACHE):
+        yield valores[inicio:inicio + TAMANO_LOTE_CACHE]
+
+
+def obtener(clusters, ruta=None):
+    """Retorna {cluster: (region, zona)} de los clusters con una entrada vigente en la caché.
+    Los que no están o vencieron cuentan como fallos; si la caché no está disponible retorna {}."""
+    activa, ttl, _ = configuracion()
+    claves = list(dict.fromkeys(str(cluster) for cluster in clusters))
+    if not activa or not claves:
+        return {}
+    ahora = time.time()
+    try:
+        conexion = abrir_cache(ruta)
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo abrir la caché de regiones: {e}")
+        return {}
+    try:
+        with metricas.etapa("cache_regiones", metricas.CONSULTA, clusters=len(claves)) as registro:
+            encontrados = {}
+            expirados = 0
+            for lote in _lotes(claves):
+                filas = conexion.execute(
+                    f"SELECT cluster, region, zona, guardado FROM regiones "
+                    f"WHERE cluster IN ({', '.join('?' * len(lote))})", lote
+                ).fetchall()
+                for cluster, region, zona, guardado in filas:
+                    if ahora - guardado <= ttl:
+                        encontrados[cluster] = (region, zona)
+                    else:
+                        expirados += 1
+            with conexion:
+                conexion.executemany("UPDATE regiones SET ultimo_uso = ? WHERE cluster = ?",
+                                     [(ahora, cluster) for cluster in encontrados])
+                _sumar(conexion, aciertos=len(encontrados), fallos=len(claves) - len(encontrados),
+                       expirados=expirados)
+            registro["filas"] = len(encontrados)
+            registro["aciertos"] = len(encontrados)
+            registro["fallos"] = len(claves) - len(encontrados)
+        logging.info(f"Caché de regiones: {len(encontrados)} aciertos, {len(claves) - len(encontrados)} fallos")
+        return encontrados
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo leer la caché de regiones: {e}")
+        return {}
+    finally:
+        conexion.close()
+
+
+def guardar(regiones_zonas, ruta=None):
+    """Guarda {cluster: (region, zona)} y desaloja las entradas vencidas y, si se supera el máximo,
+    las usadas hace más tiempo"""
+    activa, ttl, max_entradas = configuracion()
+    if not activa or not regiones_zonas:
+        return
+    ahora = time.time()
+    try:
+        conexion = abrir_cache(ruta)
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo abrir la caché de regiones: {e}")
+        return
+    try:
+        with conexion:
+            conexion.executemany(
+                "INSERT INTO regiones (cluster, region, zona, guardado, ultimo_uso) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (cluster) DO UPDATE SET region = excluded.region, zona = excluded.zona, "
+                "guardado = excluded.guardado, ultimo_uso = excluded.ultimo_uso",
+                [(str(cluster), region, zona, ahora, ahora) for cluster, (region, zona) in regiones_zonas.items()],
+            )
+            desalojados = conexion.execute("DELETE FROM regiones WHERE guardado < ?", (ahora - ttl,)).rowcount
+            desalojados += conexion.execute(
+                "DELETE FROM regiones WHERE cluster IN "
+                "(SELECT cluster FROM regiones ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?)",
+                (max_entradas,),
+            ).rowcount
+            _sumar(conexion, desalojos=desalojados)
+    except sqlite3.Error as e:
+        logging.warning(f"No se pudo actualizar la caché de regiones: {e}")
+    finally:
+        conexion.close()
+
+
+def estadisticas(ruta=None):
+    """Retorna las entradas guardadas y los contadores acumulados entre ejecuciones"""
+    conexion = abrir_cache(ruta)
+    try:
+        datos = dict.fromkeys(CONTADORES, 0)
+        datos.update(conexion.execute("SELECT nombre, valor FROM contadores").fetchall())
+        datos["entradas"] = conexion.execute("SELECT count(*) FROM regiones").fetchone()[0]
+        consultas = datos["aciertos"] + datos["fallos"]
+        datos["tasa_aciertos"] = round(datos["aciertos"] / consultas, 4) if consultas else None
+        return datos
+    finally:
+        conexion.close()
+
+
+def limpiar(ruta=None):
+    """Vacía la caché y reinicia los contadores"""
+    conexion = abrir_cache(ruta)
+    try:
+        with conexion:
+            conexion.execute("DELETE FROM regiones")
+            conexion.execute("DELETE FROM contadores")
+    finally:
+        conexion.close()
+
+
+if __name__ == "__main__":
+    if "--limpiar" in sys.argv[1:]:
+        limpiar()
+        print("Caché de regiones vaciada")
+    for nombre, valor in estadisticas().items():
+        print(f"{nombre}: {valor}")
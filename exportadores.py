@@ -0,0 +1,133 @@
+import csv
+import logging
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+FORMATOS_EXPORTACION = ("xlsx", "csv", "parquet")
+TAMANO_BLOQUE_PARQUET = 10000  # filas acumuladas antes de escribir un row group
+
+
+def _encabezado_negrita(hoja, columnas):
+    """Fila de encabezados en negrita: el estilo se aplica una sola vez al crear la hoja"""
+    negrita = Font(bold=True)
+    encabezado = []
+    for columna in columnas:
+        celda = WriteOnlyCell(hoja, value=columna)
+        celda.font = negrita
+        encabezado.append(celda)
+    return encabezado
+
+
+class EscritorXlsx:
+    """Escribe filas en un libro de Excel en modo de solo escritura (memoria constante)"""
+
+    def __init__(self, ruta, columnas, hoja="Sheet1"):
+        self.ruta = ruta
+        self.libro = Workbook(write_only=True)
+        self.hoja = self.libro.create_sheet(hoja)
+        self.hoja.append(_encabezado_negrita(self.hoja, columnas))
+
+    def escribir(self, fila):
+        self.hoja.append(fila)
+
+    def cerrar(self):
+        self.libro.save(self.ruta)
+
+
+class EscritorXlsxHojas:
+    """Escribe filas en varias hojas de un mismo libro en modo de solo escritura.
+    'hojas' es {nombre: columnas}; las filas de cada hoja pueden llegar intercaladas."""
+
+    def __init__(self, ruta, hojas):
+        self.ruta = ruta
+        self.libro = Workbook(write_only=True)
+        self.hojas = {}
+        for nombre, columnas in hojas.items():
+            hoja = self.libro.create_sheet(nombre)
+            hoja.append(_encabezado_negrita(hoja, columnas))
+            self.hojas[nombre] = hoja
+
+    def escribir(self, hoja, fila):
+        self.hojas[hoja].append(fila)
+
+    def cerrar(self):
+        self.libro.save(self.ruta)
+
+
+class EscritorCsv:
+    """Escribe filas en un archivo CSV a medida que se generan"""
+
+    def __init__(self, ruta, columnas):
+        self.ruta = ruta
+        self.archivo = open(ruta, "w", newline="", encoding="utf-8")
+        self.escritor = csv.writer(self.archivo)
+        self.escritor.writerow(columnas)
+
+    def escribir(self, fila):
+        self.escritor.writerow(fila)
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+class EscritorParquet:
+    """Escribe filas en Parquet por bloques; requiere pyarrow"""
+
+    def __init__(self, ruta, columnas, tipos=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.ruta = ruta
+        self.columnas = columnas
+        tipos = tipos or {}
+        # Tipos declarados por alias ("int64", "float64", ...); el resto se guarda como texto
+        self.esquema = pa.schema([
+            (columna, pa.type_for_alias(tipos[columna]) if columna in tipos else pa.string())
+            for columna in columnas
+        ])
+        self.escritor = pq.ParquetWriter(ruta, self.esquema)
+        self.bloque = []
+
+    def _convertir(self, valor, tipo):
+        if valor is None or tipo != self.pa.string():
+            return valor
+        return str(valor)
+
+    def _vaciar(self):
+        if not self.bloque:
+            return
+        arreglos = [
+            self.pa.array([self._convertir(fila[i], campo.type) for fila in self.bloque], type=campo.type)
+            for i, campo in enumerate(self.esquema)
+        ]
+        self.escritor.write_table(self.pa.Table.from_arrays(arreglos, schema=self.esquema))
+        self.bloque = []
+
+    def escribir(self, fila):
+        self.bloque.append(fila)
+        if len(self.bloque) >= TAMANO_BLOQUE_PARQUET:
+            self._vaciar()
+
+    def cerrar(self):
+        self._vaciar()
+        self.escritor.close()
+
+
+def crear_escritor(formato, ruta_base, columnas, tipos_parquet=None, hoja="Sheet1"):
+    """Crea el escritor del formato indicado; retorna None si el formato no está disponible"""
+    ruta = f"{ruta_base}.{formato}"
+    if formato == "xlsx":
+        return EscritorXlsx(ruta, columnas, hoja=hoja)
+    if formato == "csv":
+        return EscritorCsv(ruta, columnas)
+    if formato == "parquet":
+        try:
+            return EscritorParquet(ruta, columnas, tipos_parquet)
+        except ImportError:
+            logging.error("Para exportar a Parquet es necesario instalar pyarrow")
+            return None
+    logging.error(f"Formato de exportación no soportado: {formato}")
+    return None
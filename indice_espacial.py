@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+RADIO_TIERRA_M = 6371008.8
+METROS_POR_GRADO = 111320.0
+
+# Celdas vecinas a revisar. Dentro de un mismo conjunto basta la mitad de la vecindad
+# (cada par de celdas se compara una sola vez); contra otro conjunto se revisan las nueve.
+VECINDAD_MEDIA = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+VECINDAD_COMPLETA = [(df, dc) for df in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+
+def distancia_m(lat1, lon1, lat2, lon2):
+    """Distancia haversine en metros (acepta escalares o arreglos)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(valor, dtype="float64")) for valor in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def coordenadas_validas(latitudes, longitudes):
+    """Máscara de puntos utilizables: finitos, dentro de rango y no (0, 0), que es como llegan las celdas vacías"""
+    latitudes = np.asarray(latitudes, dtype="float64")
+    longitudes = np.asarray(longitudes, dtype="float64")
+    return (np.isfinite(latitudes) & np.isfinite(longitudes)
+            & (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+            & ~((latitudes == 0) | (longitudes == 0)))
+
+
+class IndiceGrilla:
+    """Hash espacial en grilla: cada punto cae en una celda de al menos tamano_celda_m de lado,
+    así una búsqueda por radio solo compara los puntos de celdas vecinas y el costo es casi lineal."""
+
+    def __init__(self, latitudes, longitudes, tamano_celda_m, latitud_maxima=None):
+        if tamano_celda_m <= 0:
+            raise ValueError("El tamaño de celda del índice debe ser mayor que cero")
+        self.latitudes = np.asarray(latitudes, dtype="float64")
+        self.longitudes = np.asarray(longitudes, dtype="float64")
+        self.tamano_celda_m = float(tamano_celda_m)
+        if latitud_maxima is None:
+            latitud_maxima = float(np.abs(self.latitudes).max()) if len(self.latitudes) else 0.0
+        # Un grado de longitud se achica hacia los polos: el ancho se calcula con la latitud
+        # más alejada del ecuador para que ninguna celda mida menos que tamano_celda_m
+        coseno = max(math.cos(math.radians(min(latitud_maxima, 89.9))), 0.01)
+        self.alto = self.tamano_celda_m / METROS_POR_GRADO
+        self.ancho = self.tamano_celda_m / (METROS_POR_GRADO * coseno)
+        self.celdas = self._celdas(self.latitudes, self.longitudes)
+
+    def _celdas(self, latitudes, longitudes):
+        return pd.DataFrame({
+            "fila": np.floor(latitudes / self.alto).astype("int64"),
+            "columna": np.floor(longitudes / self.ancho).astype("int64"),
+            "punto": np.arange(len(latitudes)),
+        })
+
+    def _pares(self, celdas, latitudes, longitudes, radio_m, vecindad, mismo_conjunto):
+        """Une cada celda con sus vecinas (hash join) y filtra los candidatos por distancia real"""
+        partes = []
+        for desplazamiento_fila, desplazamiento_columna in vecindad:
+            vecinos = self.celdas.assign(fila=self.celdas["fila"] - desplazamiento_fila,
+                                         columna=self.celdas["columna"] - desplazamiento_columna)
+            candidatos = celdas.merge(vecinos, on=["fila", "columna"], suffixes=("_i", "_j"))
+            i = candidatos["punto_i"].to_numpy()
+            j = candidatos["punto_j"].to_numpy()
+            if mismo_conjunto and (desplazamiento_fila, desplazamiento_columna) == (0, 0):
+                mantener = i < j
+                i, j = i[mantener], j[mantener]
+            distancias = distancia_m(latitudes[i], longitudes[i], self.latitudes[j], self.longitudes[j])
+            cercanos = distancias <= radio_m
+            partes.append(pd.DataFrame({"i": i[cercanos], "j": j[cercanos], "distancia_m": distancias[cercanos]}))
+        if not partes:
+            return pd.DataFrame({"i": [], "j": [], "distancia_m": []})
+        return pd.concat(partes, ignore_index=True)
+
+    def _validar_radio(self, radio_m):
+        if radio_m <= 0:
+            raise ValueError("El radio debe ser mayor que cero")
+        if radio_m > self.tamano_celda_m:
+            raise ValueError("El radio no puede superar el tamaño de celda del índice")
+
+    def pares_cercanos(self, radio_m):
+        """Pares (i, j) de puntos del índice, con i < j, a radio_m metros o menos"""
+        self._validar_radio(radio_m)
+        pares = self._pares(self.celdas, self.latitudes, self.longitudes, radio_m, VECINDAD_MEDIA, True)
+        # Con las celdas vecinas el punto del índice puede quedar primero: se ordena cada par
+        i = pares["i"].to_numpy()
+        j = pares["j"].to_numpy()
+        return pares.assign(i=np.minimum(i, j), j=np.maximum(i, j))
+
+    def cercanos_a(self, latitudes, longitudes, radio_m):
+        """Pares (i, j): punto i de las coordenadas dadas y punto j del índice a radio_m metros o menos.
+        Las coordenadas consultadas deben caber en la latitud máxima con la que se construyó el índice."""
+        self._validar_radio(radio_m)
+        latitudes = np.asarray(latitudes, dtype="float64")
+        longitudes = np.asarray(longitudes, dtype="float64")
+        return self._pares(self._celdas(latitudes, longitudes), latitudes, longitudes, radio_m,
+                           VECINDAD_COMPLETA, False)
+
+
+def lejanos_del_centro(grupos, latitudes, longitudes, distancia_maxima_m, minimo_puntos=3):
+    """Puntos a más de distancia_maxima_m del centro de su grupo (mediana de latitud y longitud,
+    que no se desplaza por los propios puntos errados). Los grupos con menos de minimo_puntos se omiten.
+    Retorna un DataFrame (i, distancia_m, invertida); 'invertida' indica que el punto con latitud y
+    longitud intercambiadas sí cae cerca del centro."""
+    puntos = pd.DataFrame({"grupo": np.asarray(grupos), "latitud": latitudes, "longitud": longitudes})
+    por_grupo = puntos.groupby("grupo", sort=False)
+    centro_latitud = por_grupo["latitud"].transform("median").to_numpy()
+    centro_longitud = por_grupo["longitud"].transform("median").to_numpy()
+    tamano = por_grupo["latitud"].transform("size").to_numpy()
+
+    latitudes = puntos["latitud"].to_numpy()
+    longitudes = puntos["longitud"].to_numpy()
+    distancias = distancia_m(latitudes, longitudes, centro_latitud, centro_longitud)
+    lejanos = np.flatnonzero((tamano >= minimo_puntos) & (distancias > distancia_maxima_m))
+    invertidas = distancia_m(longitudes[lejanos], latitudes[lejanos],
+                             centro_latitud[lejanos], centro_longitud[lejanos]) <= distancia_maxima_m
+    return pd.DataFrame({"i": lejanos, "distancia_m": distancias[lejanos], "invertida": invertidas})
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import metricas
+
+RUTA_DATA = "data/data.xlsx"
+DIR_CACHE = os.path.join("data", ".cache")
+
+# Hojas ya leídas en este proceso: {(ruta, hoja): (mtime_ns, tamaño, DataFrame)}
+_hojas = {}
+_lock_hojas = threading.Lock()
+# Un lock por hoja: hilos que leen hojas distintas no se bloquean entre sí
+_locks_por_hoja = {}
+# Hash del contenido por (ruta, mtime_ns, tamaño) para no recalcularlo en cada hoja
+_hashes = {}
+
+try:
+    import pyarrow  # noqa: F401  (solo se usa a través de pandas)
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+_aviso_sin_parquet = False
+
+
+def avisar_sin_parquet():
+    """Avisa una sola vez por proceso que sin pyarrow no hay caché Parquet ni manifiesto de NAPs"""
+    global _aviso_sin_parquet
+    if not _aviso_sin_parquet:
+        _aviso_sin_parquet = True
+        logging.warning("pyarrow no está instalado: la caché Parquet de hojas y el manifiesto de NAPs "
+                        "están desactivados (instalar con pip install -r requirements.txt)")
+
+
+def hash_archivo(ruta):
+    """Calcula el SHA-256 del contenido del archivo"""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _nombre_base_cache(ruta, hoja):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    # Incluir un resumen de la ruta para no mezclar libros con el mismo nombre en carpetas distintas
+    ruta_hash = hashlib.md5(os.path.abspath(ruta).encode()).hexdigest()[:8]
+    return f"{nombre}_{ruta_hash}_{hoja}_"
+
+
+def _ruta_cache(ruta, hoja, estado):
+    """Ruta del archivo Parquet asociado a la hoja, identificado por hash y fecha de modificación"""
+    clave_hash = (os.path.abspath(ruta), estado.st_mtime_ns, estado.st_size)
+    if clave_hash not in _hashes:
+        # Dos hilos pueden calcularlo a la vez; el resultado es el mismo
+        _hashes[clave_hash] = hash_archivo(ruta)
+    clave = f"{_hashes[clave_hash][:16]}_{estado.st_mtime_ns}"
+    return os.path.join(DIR_CACHE, f"{_nombre_base_cache(ruta, hoja)}{clave}.parquet")
+
+
+def _leer_cache(ruta_cache):
+    try:
+        return pd.read_parquet(ruta_cache)
+    except Exception as e:
+        logging.warning(f"No se pudo leer la caché {ruta_cache}: {e}")
+        return None
+
+
+def _guardar_cache(df, ruta, hoja, ruta_cache):
+    """Guarda la hoja en formato columnar y elimina versiones anteriores de la misma hoja"""
+    try:
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        temporal = f"{ruta_cache}.tmp"
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta_cache)
+    except Exception as e:
+        # Columnas con tipos mezclados no se pueden guardar en Parquet; se sigue sin caché
+        logging.debug(f"No se guardó la caché de la hoja '{hoja}': {e}")
+        return
+    prefijo = _nombre_base_cache(ruta, hoja)
+    for archivo in os.listdir(DIR_CACHE):
+        anterior = os.path.join(DIR_CACHE, archivo)
+        if archivo.startswith(prefijo) and anterior != ruta_cache:
+            try:
+                os.remove(anterior)
+            except OSError:
+                pass
+
+
+def leer_hoja(hoja, ruta=RUTA_DATA, usar_cache=True):
+    """Lee una hoja del libro una sola vez por proceso, usando la caché Parquet si el archivo no cambió.
+    El DataFrame devuelto es compartido: no debe modificarse en el lugar."""
+    estado = os.stat(ruta)
+    clave = (os.path.abspath(ruta), hoja)
+    with _lock_hojas:
+        lock_hoja = _locks_por_hoja.setdefault(clave, threading.Lock())
+    with lock_hoja:
+        guardado = _hojas.get(clave)
+        if guardado and guardado[0] == estado.st_mtime_ns and guardado[1] == estado.st_size:
+            return guardado[2]
+
+        df = None
+        ruta_cache = None
+        if usar_cache and not PARQUET_DISPONIBLE:
+            avisar_sin_parquet()
+        elif usar_cache:
+            ruta_cache = _ruta_cache(ruta, hoja, estado)
+            if os.path.exists(ruta_cache):
+                with metricas.etapa(f"leer_hoja:{hoja}", metricas.LECTURA, fuente="parquet",
+                                    bytes=metricas.tamano_archivo(ruta_cache)) as registro:
+                    df = _leer_cache(ruta_cache)
+                    registro["filas"] = len(df) if df is not None else 0
+                if df is not None:
+                    logging.info(f"Hoja '{hoja}' cargada desde la caché {ruta_cache}")
+
+        if df is None:
+            with metricas.etapa(f"leer_hoja:{hoja}", metricas.LECTURA, fuente="excel",
+                                bytes=estado.st_size) as registro:
+                df = pd.read_excel(ruta, sheet_name=hoja)
+                registro["filas"] = len(df)
+            if ruta_cache:
+                _guardar_cache(df, ruta, hoja, ruta_cache)
+
+        with _lock_hojas:
+            _hojas[clave] = (estado.st_mtime_ns, estado.st_size, df)
+        return df
+
+
+def limpiar_cache_memoria():
+    """Olvida las hojas leídas en este proceso (la caché en disco se conserva)"""
+    with _lock_hojas:
+        _hojas.clear()
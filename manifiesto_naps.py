@@ -0,0 +1,73 @@
+"""Manifiesto de la última validación de NAPs: un hash del contenido de cada fila, por CODIGO_NAP.
+Permite volver a validar solo los NAPs nuevos o modificados desde la ejecución anterior."""
+import hashlib
+import logging
+import os
+
+import pandas as pd
+
+import lector_excel
+
+# Las coordenadas se exportan con 6 decimales; con 9 se ignora solo el ruido de punto flotante
+DECIMALES_HASH = 9
+
+
+def ruta_manifiesto(ruta_libro):
+    """Un manifiesto por libro de entrada, junto a la caché de hojas"""
+    nombre = os.path.splitext(os.path.basename(ruta_libro))[0]
+    ruta_hash = hashlib.md5(os.path.abspath(ruta_libro).encode()).hexdigest()[:8]
+    return os.path.join(lector_excel.DIR_CACHE, f"manifiesto_naps_{nombre}_{ruta_hash}.parquet")
+
+
+def hashes_filas(tabla):
+    """Hash de 64 bits del contenido de cada fila de la tabla normalizada de NAPs"""
+    # Redondear los decimales: volver a guardar el libro puede alterar el último bit de las coordenadas
+    decimales = {columna: DECIMALES_HASH for columna in tabla.select_dtypes("float").columns}
+    return pd.util.hash_pandas_object(tabla.round(decimales), index=False).to_numpy()
+
+
+def cargar_manifiesto(ruta_libro):
+    """Retorna una Serie {codigo_nap: hash} de la última ejecución, o None si no hay manifiesto"""
+    ruta = ruta_manifiesto(ruta_libro)
+    if not lector_excel.PARQUET_DISPONIBLE:
+        lector_excel.avisar_sin_parquet()
+        return None
+    if not os.path.exists(ruta):
+        return None
+    try:
+        df = pd.read_parquet(ruta)
+        return pd.Series(df["hash"].to_numpy(), index=df["codigo_nap"].to_numpy())
+    except Exception as e:
+        logging.warning(f"No se pudo leer el manifiesto {ruta}, se validarán todos los NAPs: {e}")
+        return None
+
+
+def filas_cambiadas(ruta_libro, tabla, hashes):
+    """Máscara de las filas nuevas o modificadas respecto al manifiesto; None si no hay manifiesto"""
+    anterior = cargar_manifiesto(ruta_libro)
+    if anterior is None:
+        return None
+    anterior = anterior[~anterior.index.duplicated(keep="last")]
+    codigos = tabla["codigo_nap"].astype(str).to_numpy()
+    # fill_value conserva el tipo uint64 (con NaN pasaría a float y se perderían bits del hash)
+    previos = anterior.reindex(codigos, fill_value=0).to_numpy()
+    conocidos = pd.Index(codigos).isin(anterior.index)
+    return pd.Series(~(conocidos & (previos == hashes)), index=tabla.index)
+
+
+def guardar_manifiesto(ruta_libro, tabla, hashes):
+    """Reemplaza el manifiesto con los hashes de todas las filas validadas en esta ejecución"""
+    if not lector_excel.PARQUET_DISPONIBLE:
+        lector_excel.avisar_sin_parquet()
+        return None
+    ruta = ruta_manifiesto(ruta_libro)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        pd.DataFrame({"codigo_nap": tabla["codigo_nap"].astype(str).to_numpy(), "hash": hashes}).to_parquet(
+            temporal, index=False)
+        os.replace(temporal, ruta)
+        return ruta
+    except Exception as e:
+        logging.warning(f"No se pudo guardar el manifiesto de NAPs: {e}")
+        return None
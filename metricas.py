@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DIR_METRICAS = "metricas"
+
+# Tipos de etapa usados en los reportes
+LECTURA = "read"
+CONEXION = "connect"
+CONSULTA = "query"
+TRANSFORMACION = "transform"
+EXPORTACION = "export"
+
+_registros = []
+_lock = threading.Lock()
+_inicio_ejecucion = time.time()
+
+
+@contextmanager
+def etapa(nombre, tipo, **datos):
+    """Mide el tiempo de una etapa. El diccionario entregado permite anotar 'filas', 'bytes', etc."""
+    registro = {"etapa": nombre, "tipo": tipo, **datos}
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except Exception as e:
+        registro["error"] = str(e)
+        raise
+    finally:
+        registro["segundos"] = round(time.perf_counter() - inicio, 6)
+        registro["hilo"] = threading.current_thread().name
+        with _lock:
+            _registros.append(registro)
+
+
+def registrar(nombre, tipo, segundos, **datos):
+    """Agrega una etapa medida por fuera de etapa()"""
+    registro = {"etapa": nombre, "tipo": tipo, **datos, "segundos": round(segundos, 6),
+                "hilo": threading.current_thread().name}
+    with _lock:
+        _registros.append(registro)
+
+
+def agregar(otros, **datos):
+    """Incorpora etapas medidas en otro proceso, anotadas con 'datos' (por ejemplo el libro)"""
+    with _lock:
+        _registros.extend({**registro, **datos} for registro in otros)
+
+
+def tamano_archivo(ruta):
+    try:
+        return os.path.getsize(ruta)
+    except OSError:
+        return None
+
+
+def registros():
+    with _lock:
+        return list(_registros)
+
+
+def reiniciar():
+    global _inicio_ejecucion
+    with _lock:
+        _registros.clear()
+    _inicio_ejecucion = time.time()
+
+
+def resumen():
+    """Totales por tipo de etapa: tiempo, cantidad, filas y bytes"""
+    totales = {}
+    for registro in registros():
+        total = totales.setdefault(registro["tipo"], {"segundos": 0.0, "etapas": 0, "filas": 0, "bytes": 0})
+        total["segundos"] = round(total["segundos"] + registro["segundos"], 6)
+        total["etapas"] += 1
+        total["filas"] += registro.get("filas") or 0
+        total["bytes"] += registro.get("bytes") or 0
+    return totales
+
+
+def guardar_metricas(ruta=None, **contexto):
+    """Escribe el JSON de métricas de la ejecución y retorna su ruta"""
+    if ruta is None:
+        os.makedirs(DIR_METRICAS, exist_ok=True)
+        ruta = os.path.join(DIR_METRICAS, f"metricas_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    elif os.path.dirname(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    datos = {
+        "inicio": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(_inicio_ejecucion)),
+        "duracion_s": round(time.time() - _inicio_ejecucion, 6),
+        **contexto,
+        "resumen": resumen(),
+        "etapas": registros(),
+    }
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False, default=str)
+    return ruta
@@ -0,0 +1,113 @@
+"""Liberación y validación de NAPs de varios libros de entrada, un libro por proceso."""
+import cProfile
+import glob
+import hashlib
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import Inventario_naps
+import Liberacion
+import metricas
+import snapshot_naps
+
+EXTENSIONES_LIBRO = (".xlsx", ".xlsm")
+
+
+def es_libro(ruta):
+    """Libros de Excel, sin los archivos de bloqueo '~$' que deja Excel abierto"""
+    nombre = os.path.basename(ruta)
+    return not nombre.startswith("~$") and nombre.lower().endswith(EXTENSIONES_LIBRO)
+
+
+def buscar_libros(entrada):
+    """Acepta una carpeta o un patrón glob y retorna los libros encontrados, ordenados"""
+    patron = os.path.join(entrada, "*") if os.path.isdir(entrada) else entrada
+    return sorted(ruta for ruta in glob.glob(patron) if os.path.isfile(ruta) and es_libro(ruta))
+
+
+def nombres_salida(libros):
+    """Nombre de la carpeta de salida de cada libro: su ruta relativa a la carpeta común, sin extensión.
+    Así 'proyA/data.xlsx' y 'proyB/data.xlsx' no se pisan. Si dos rutas dan el mismo nombre
+    ('a/b_c.xlsx' y 'a_b/c.xlsx', o 'data.xlsx' y 'data.xlsm') se agrega un hash corto de la ruta."""
+    if not libros:
+        return {}
+    comun = os.path.commonpath([os.path.dirname(os.path.abspath(ruta)) for ruta in libros])
+    nombres = {}
+    for ruta in libros:
+        relativa = os.path.splitext(os.path.relpath(os.path.abspath(ruta), comun))[0]
+        nombres[ruta] = relativa.replace(os.sep, "_")
+    repetidos = Counter(nombres.values())
+    for ruta, nombre in nombres.items():
+        if repetidos[nombre] > 1:
+            relativa = os.path.relpath(os.path.abspath(ruta), comun)
+            nombres[ruta] = f"{nombre}_{hashlib.md5(relativa.encode()).hexdigest()[:8]}"
+    return nombres
+
+
+def procesar_libro(ruta, nombre, opciones):
+    """Ejecuta la liberación y la validación de NAPs de un libro en sus propias carpetas de salida.
+    Se ejecuta en un proceso del pool: retorna un diccionario con el resultado y las métricas.
+    Con opciones["dir_perfiles"] el trabajo corre bajo cProfile y las estadísticas quedan en
+    <dir_perfiles>/<nombre>.prof, para que el proceso principal las combine (script.py --profile)."""
+    metricas.reiniciar()
+    inicio = time.perf_counter()
+    resultado = {"libro": ruta, "nombre": nombre, "liberacion": False, "naps": False, "error": None}
+    perfil = cProfile.Profile() if opciones.get("dir_perfiles") else None
+    if perfil:
+        perfil.enable()
+    try:
+        resultado["liberacion"] = bool(Liberacion.main(
+            lote=opciones.get("lote", False), ruta_entrada=ruta,
+            dir_salida=os.path.join(opciones.get("dir_liberacion", Liberacion.DIR_GENERADOR), nombre),
+            streaming=opciones.get("streaming", False), modo_alcance=opciones.get("modo_alcance"),
+            consolidado=opciones.get("consolidado", False),
+        ))
+        resultado["naps"] = bool(Inventario_naps.main(
+            ruta_entrada=ruta,
+            dir_salida=os.path.join(opciones.get("dir_naps", Inventario_naps.DIR_REGISTROS), nombre),
+            formatos=opciones.get("formatos", ("xlsx",)), snapshot=opciones.get("snapshot", False),
+            sincronizar=False, incremental=opciones.get("incremental", False),
+            carga_bd=opciones.get("carga_bd"), validacion_espacial=opciones.get("validacion_espacial"),
+        ))
+    except Exception as e:
+        logging.error(f"Error al procesar el libro {ruta}: {e}")
+        resultado["error"] = str(e)
+    finally:
+        if perfil:
+            perfil.disable()
+            perfil.dump_stats(os.path.join(opciones["dir_perfiles"], f"{nombre}.prof"))
+    resultado["segundos"] = time.perf_counter() - inicio
+    resultado["metricas"] = metricas.registros()
+    return resultado
+
+
+def procesar_libros(libros, opciones, procesos=None):
+    """Procesa los libros en un pool de procesos (por defecto uno por núcleo).
+    Retorna la lista de resultados en el orden de los libros."""
+    if not libros:
+        return []
+    nombres = nombres_salida(libros)
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(libros)))
+
+    # El snapshot se sincroniza una sola vez aquí; los procesos solo lo leen
+    if opciones.get("snapshot"):
+        snapshot_naps.sincronizar_snapshot()
+
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = {ejecutor.submit(procesar_libro, ruta, nombres[ruta], opciones): ruta for ruta in libros}
+        for futuro in as_completed(futuros):
+            ruta = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # El proceso murió (por ejemplo, sin memoria) antes de poder reportar
+                logging.error(f"Error al procesar el libro {ruta}: {e}")
+                resultado = {"libro": ruta, "nombre": nombres[ruta], "liberacion": False, "naps": False,
+                             "error": str(e), "segundos": 0.0, "metricas": []}
+            metricas.agregar(resultado.pop("metricas"), libro=ruta)
+            resultados[ruta] = resultado
+    return [resultados[ruta] for ruta in libros]
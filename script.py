@@ -1,13 +1,55 @@
-import Inventario_naps as inv_naps
-import Liberacion as lib_clouster
-import os
 import time
+
+INICIO = time.perf_counter()
+
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
 import sys
 from colorama import Fore, Back, Style, init
 
 # Inicializar colorama
 init(autoreset=True)
 
+# Los módulos de trabajo (pandas, psycopg2, openpyxl) se importan solo al usarlos
+TIEMPOS_IMPORTACION = {}
+
+def cargar_modulo(nombre):
+    """Importa un módulo la primera vez que se necesita y registra cuánto tardó."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nombre)
+    TIEMPOS_IMPORTACION[nombre] = time.perf_counter() - inicio
+    return modulo
+
+def configurar_logging():
+    """Configura el logging una sola vez, antes de ejecutar un módulo."""
+    logging.basicConfig(level=logging.DEBUG)
+
+def liberacion():
+    configurar_logging()
+    return cargar_modulo("Liberacion")
+
+def inventario_naps():
+    configurar_logging()
+    return cargar_modulo("Inventario_naps")
+
+def marcar_listo():
+    """Registra el instante en que se mostró por primera vez el menú, la ayuda o empezó el subcomando."""
+    global INICIO_LISTO
+    if INICIO_LISTO is None:
+        INICIO_LISTO = time.perf_counter()
+
+def reporte_tiempos_importacion():
+    """Muestra el tiempo de arranque y de cada importación diferida."""
+    if INICIO_LISTO is not None:
+        print(f"Arranque hasta el menú/ayuda/subcomando: {(INICIO_LISTO - INICIO) * 1000:.1f} ms", file=sys.stderr)
+    for nombre, segundos in TIEMPOS_IMPORTACION.items():
+        print(f"Importación de {nombre}: {segundos * 1000:.1f} ms", file=sys.stderr)
+
 def limpiar_pantalla():
     """Limpia la pantalla de la consola."""
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -60,6 +102,7 @@ def mostrar_menu():
     print(Fore.RED + "  4. " + Fore.WHITE + "Salir")
     print(Fore.CYAN + "  " + "-" * 40)
     print(Fore.YELLOW + "  Presione 'h' para ayuda en cualquier momento")
+    marcar_listo()
 
 def mostrar_ayuda():
     """Muestra información de ayuda sobre el sistema."""
@@ -113,21 +156,23 @@ def eleccion():
                 print(Fore.CYAN + "\nIniciando módulo de Liberación de Clouster...\n")
                 time.sleep(1)
                 try:
-                    lib_clouster.main()
+                    liberacion().main()
                 except Exception as e:
                     print(Fore.RED + f"\nError en el módulo de Liberación: {str(e)}")
                     time.sleep(2)
                 volver_al_menu()
+                continue
             elif opcion == "2":
                 limpiar_pantalla()
                 print(Fore.CYAN + "\nIniciando módulo de Actualización de NAPs...\n")
                 time.sleep(1)
                 try:
-                    inv_naps.main()
+                    inventario_naps().main()
                 except Exception as e:
                     print(Fore.RED + f"\nError en el módulo de NAPs: {str(e)}")
                     time.sleep(2)
                 volver_al_menu()
+                continue
             elif opcion == "3":
                 mostrar_ayuda()
                 mostrar_encabezado()
@@ -164,16 +209,295 @@ def confirmar_salida():
         mostrar_menu()
 
 def volver_al_menu():
-    """Función para volver al menú principal después de completar una tarea."""
+    """Espera confirmación y vuelve a dibujar el menú; el bucle de eleccion() continúa."""
     print("")
     input(Fore.CYAN + "Presione ENTER para volver al menú principal...")
-    eleccion()
-    
+    mostrar_encabezado()
+    mostrar_menu()
+
+# Códigos de salida del modo no interactivo
+EXITO = 0
+ERROR = 1
+INTERRUMPIDO = 130
+
+def ejecutar_liberacion(args):
+    """Ejecuta la liberación de clusters sin interacción; retorna True si terminó bien."""
+    return bool(liberacion().main(lote=args.lote, ruta_entrada=args.entrada,
+                                    dir_salida=args.salida_liberacion, streaming=args.streaming,
+                                    modo_alcance=args.modo_alcance, consolidado=args.consolidado))
+
+def modo_carga_bd(args):
+    """Traduce --cargar-bd / --simular-carga al modo de carga de Inventario_naps."""
+    if args.simular_carga:
+        return inventario_naps().CARGA_SIMULAR
+    if args.cargar_bd:
+        return inventario_naps().CARGA_APLICAR
+    return None
+
+def validacion_espacial(args):
+    """Traduce --validar-coordenadas y sus umbrales a los argumentos de Inventario_naps.validar_coordenadas."""
+    if not args.validar_coordenadas:
+        return None
+    opciones = {"radio_m": args.radio_duplicados, "distancia_cluster_m": args.distancia_cluster,
+                "con_inventario": args.con_inventario}
+    return {clave: valor for clave, valor in opciones.items() if valor is not None}
+
+def ejecutar_naps(args):
+    """Ejecuta la validación de NAPs sin interacción; retorna True si terminó bien."""
+    return bool(inventario_naps().main(ruta_entrada=args.entrada, dir_salida=args.salida_naps,
+                                formatos=args.formato, snapshot=args.snapshot,
+                                incremental=not args.completo, carga_bd=modo_carga_bd(args),
+                                validacion_espacial=validacion_espacial(args)))
+
+def cronometrar(funcion, args):
+    """Ejecuta una tarea y retorna (resultado, segundos); los errores cuentan como fallo."""
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion(args)
+    except Exception as e:
+        print(f"Error en {funcion.__name__}: {str(e)}", file=sys.stderr)
+        resultado = False
+    return resultado, time.perf_counter() - inicio
+
+def perfilando(args):
+    return args.profile or args.profile_salida is not None
+
+def ejecutar_todo(args):
+    """Ejecuta la liberación y la validación de NAPs a la vez en dos hilos.
+    Las esperas de la BD y la escritura de archivos de un flujo se solapan con el trabajo del otro.
+    Con --profile se ejecutan una tras otra: cProfile solo mide el hilo que lo activó."""
+    # Importar los módulos antes de lanzar los hilos
+    liberacion()
+    inventario_naps()
+
+    tareas = {"Liberación de clusters": ejecutar_liberacion, "Validación de NAPs": ejecutar_naps}
+    inicio = time.perf_counter()
+    if perfilando(args):
+        resultados = {nombre: cronometrar(funcion, args) for nombre, funcion in tareas.items()}
+    else:
+        with ThreadPoolExecutor(max_workers=2) as ejecutor:
+            futuros = {nombre: ejecutor.submit(cronometrar, funcion, args) for nombre, funcion in tareas.items()}
+            resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    total = time.perf_counter() - inicio
+
+    print("\n" + "=" * 50)
+    print("RESUMEN")
+    for nombre, (resultado, segundos) in resultados.items():
+        estado = "OK" if resultado else "ERROR"
+        print(f"  {nombre}: {estado} ({segundos:.2f} s)")
+    print(f"  Tiempo total: {total:.2f} s")
+    return all(resultado for resultado, _ in resultados.values())
+
+def opciones_libros(args):
+    """Opciones de procesamiento_libros.procesar_libro a partir de los argumentos de la línea de comandos."""
+    return {
+        "lote": args.lote, "streaming": args.streaming, "modo_alcance": args.modo_alcance,
+        "consolidado": args.consolidado,
+        "dir_liberacion": args.salida_liberacion,
+        "dir_naps": args.salida_naps, "formatos": args.formato, "snapshot": args.snapshot,
+        "incremental": not args.completo, "carga_bd": modo_carga_bd(args),
+        "validacion_espacial": validacion_espacial(args),
+    }
+
+def ejecutar_libros(args):
+    """Procesa cada libro de una carpeta (o patrón glob) en un pool de procesos y muestra un resumen."""
+    configurar_logging()
+    modulo = cargar_modulo("procesamiento_libros")
+    libros = modulo.buscar_libros(args.entrada)
+    if not libros:
+        print(f"No se encontraron libros en {args.entrada}", file=sys.stderr)
+        return False
+
+    print(f"Procesando {len(libros)} libros...")
+    inicio = time.perf_counter()
+    opciones = opciones_libros(args)
+    # Con --profile cada proceso del pool guarda su perfil aquí y ejecutar_con_perfil los combina
+    opciones["dir_perfiles"] = args.dir_perfiles
+    resultados = modulo.procesar_libros(libros, opciones, args.procesos)
+    total = time.perf_counter() - inicio
+
+    print("\n" + "=" * 50)
+    print("RESUMEN")
+    for resultado in resultados:
+        liberacion_ok = "OK" if resultado["liberacion"] else "ERROR"
+        naps_ok = "OK" if resultado["naps"] else "ERROR"
+        print(f"  {resultado['nombre']}: liberación {liberacion_ok}, NAPs {naps_ok} ({resultado['segundos']:.2f} s)")
+    print(f"  Tiempo total: {total:.2f} s")
+    return all(resultado["liberacion"] and resultado["naps"] for resultado in resultados)
+
+def ejecutar_vigilancia(args):
+    """Procesa cada libro nuevo o modificado de la carpeta de entrada hasta que se detenga con Ctrl+C."""
+    configurar_logging()
+    modulo = cargar_modulo("vigilancia")
+    vigilante = modulo.Vigilante(args.entrada, opciones_libros(args), espera_estable=args.espera,
+                                 intervalo=args.intervalo, procesar_existentes=args.procesar_existentes,
+                                 sondeo=args.sondeo, metricas_por_libro=args.metricas_por_libro)
+    return vigilante.ejecutar()
+
+class ParserConTiempos(argparse.ArgumentParser):
+    """ArgumentParser que marca el fin del arranque al imprimir la ayuda (también la de los subcomandos)."""
+
+    def print_help(self, file=None):
+        super().print_help(file)
+        marcar_listo()
+
+def crear_parser():
+    """Define los subcomandos del modo no interactivo."""
+    parser = ParserConTiempos(
+        description="Sistema de gestión automatizada. Sin subcomando se abre el menú interactivo.",
+        epilog="Para un desglose completo de importaciones: python -X importtime script.py ..."
+    )
+    parser.add_argument("--tiempos-importacion", action="store_true",
+                        help="Mostrar al salir el tiempo de arranque y de las importaciones diferidas")
+    parser.add_argument("--metricas", metavar="RUTA", default=None,
+                        help="Archivo JSON con los tiempos por etapa (por defecto: metricas/metricas_<fecha>.json)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Ejecutar con cProfile y mostrar las funciones con más tiempo acumulado. "
+                             "'all' ejecuta sus dos flujos en secuencia y 'libros' combina el perfil "
+                             "de cada proceso del pool")
+    parser.add_argument("--profile-salida", metavar="RUTA", default=None,
+                        help="Guardar además las estadísticas de cProfile en RUTA (.prof); implica --profile")
+    parser.set_defaults(dir_perfiles=None)
+    subparsers = parser.add_subparsers(dest="comando")
+
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument("--entrada", default="data/data.xlsx",
+                       help="Libro de Excel con las hojas Liberacion y Naps (por defecto: data/data.xlsx)")
+
+    opciones_liberacion = argparse.ArgumentParser(add_help=False)
+    opciones_liberacion.add_argument("--salida-liberacion", default="generador",
+                                     help="Carpeta para los archivos de alcance/liberación (por defecto: generador)")
+    opciones_liberacion.add_argument("--lote", action="store_true",
+                                     help="Procesar todas las filas de la hoja Liberacion")
+    opciones_liberacion.add_argument("--consolidado", action="store_true",
+                                     help="Con --lote, un solo libro con las hojas Liberación y Alcance "
+                                          "en lugar de un archivo por cluster")
+    opciones_liberacion.add_argument("--streaming", action="store_true",
+                                     help="Recorrer el historial del cluster con un cursor del servidor")
+    opciones_liberacion.add_argument("--modo-alcance", choices=["pandas", "streaming", "sql"], default=None,
+                                     help="Cálculo del alcance: historial en pandas (por defecto), cursor del "
+                                          "servidor o agregado en PostgreSQL; --streaming equivale a 'streaming'")
+
+    opciones_naps = argparse.ArgumentParser(add_help=False)
+    opciones_naps.add_argument("--salida-naps", default="Registros_Naps",
+                               help="Carpeta para los NAPs faltantes (por defecto: Registros_Naps)")
+    opciones_naps.add_argument("--formato", nargs="+", default=["xlsx"], choices=["xlsx", "csv", "parquet"],
+                               help="Formatos de exportación de los NAPs faltantes")
+    opciones_naps.add_argument("--snapshot", action="store_true",
+                               help="Validar contra la copia local de inv_naps (sincronización incremental)")
+    opciones_naps.add_argument("--completo", action="store_true",
+                               help="Validar todos los NAPs, no solo los nuevos o modificados desde la última ejecución")
+    opciones_naps.add_argument("--cargar-bd", action="store_true",
+                               help="Insertar los NAPs faltantes en inv_naps (COPY a una tabla temporal, una transacción)")
+    opciones_naps.add_argument("--simular-carga", action="store_true",
+                               help="Como --cargar-bd, pero deshace la transacción y solo informa los conteos")
+    opciones_naps.add_argument("--validar-coordenadas", action="store_true",
+                               help="Buscar NAPs superpuestos y NAPs lejos del centro de su cluster")
+    opciones_naps.add_argument("--radio-duplicados", type=float, default=None, metavar="METROS",
+                               help="Distancia a la que dos NAPs se consideran superpuestos (por defecto: 5)")
+    opciones_naps.add_argument("--distancia-cluster", type=float, default=None, metavar="METROS",
+                               help="Distancia máxima al centro del cluster (por defecto: 3000)")
+    opciones_naps.add_argument("--con-inventario", action="store_true", default=None,
+                               help="Comparar también contra las coordenadas registradas en inv_naps")
+
+    liberar = subparsers.add_parser("liberar", parents=[comun, opciones_liberacion],
+                                    help="Liberación de clusters")
+    liberar.set_defaults(funcion=ejecutar_liberacion)
+    naps = subparsers.add_parser("naps", parents=[comun, opciones_naps],
+                                 help="Validación y registro de NAPs")
+    naps.set_defaults(funcion=ejecutar_naps)
+    todo = subparsers.add_parser("all", parents=[comun, opciones_liberacion, opciones_naps],
+                                 help="Liberación y validación de NAPs en paralelo")
+    todo.set_defaults(funcion=ejecutar_todo)
+    libros = subparsers.add_parser("libros", parents=[opciones_liberacion, opciones_naps],
+                                   help="Liberación y validación de NAPs de varios libros en paralelo")
+    libros.add_argument("--entrada", default="data",
+                        help="Carpeta o patrón glob con los libros a procesar (por defecto: data)")
+    libros.add_argument("--procesos", type=int, default=None,
+                        help="Procesos del pool (por defecto: uno por núcleo)")
+    libros.set_defaults(funcion=ejecutar_libros)
+    vigilar = subparsers.add_parser("vigilar", parents=[opciones_liberacion, opciones_naps],
+                                    help="Procesar automáticamente cada libro nuevo o modificado de una carpeta",
+                                    description="Usa inotify a través de watchdog (requirements.txt); si watchdog "
+                                                "no está instalado revisa la carpeta por sondeo.")
+    vigilar.add_argument("--entrada", default="data",
+                         help="Carpeta a vigilar (por defecto: data)")
+    vigilar.add_argument("--espera", type=float, default=3.0, metavar="SEGUNDOS",
+                         help="Tiempo sin cambios de tamaño ni fecha antes de procesar un libro (por defecto: 3)")
+    vigilar.add_argument("--intervalo", type=float, default=2.0, metavar="SEGUNDOS",
+                         help="Intervalo de revisión de la carpeta sin inotify (por defecto: 2)")
+    vigilar.add_argument("--procesar-existentes", action="store_true",
+                         help="Procesar también los libros que ya están en la carpeta al iniciar")
+    vigilar.add_argument("--sondeo", action="store_true",
+                         help="Revisar la carpeta periódicamente aunque watchdog (inotify) esté instalado")
+    vigilar.add_argument("--metricas-por-libro", action="store_true",
+                         help="Guardar un JSON de métricas por cada libro procesado en la carpeta metricas")
+    vigilar.set_defaults(funcion=ejecutar_vigilancia)
+    return parser
+
+def ejecutar_con_perfil(funcion, args):
+    """Ejecuta el subcomando bajo cProfile y muestra las 25 funciones con más tiempo acumulado.
+    Los perfiles de los procesos del pool de 'libros' se suman al del proceso principal."""
+    import cProfile
+    import glob
+    import pstats
+    import tempfile
+    perfil = cProfile.Profile()
+    with tempfile.TemporaryDirectory(prefix="perfiles_") as dir_perfiles:
+        args.dir_perfiles = dir_perfiles
+        try:
+            return perfil.runcall(funcion, args)
+        finally:
+            estadisticas = pstats.Stats(perfil, stream=sys.stderr)
+            for ruta in sorted(glob.glob(os.path.join(dir_perfiles, "*.prof"))):
+                estadisticas.add(ruta)
+            if args.profile_salida:
+                estadisticas.dump_stats(args.profile_salida)
+                print(f"Perfil guardado en {args.profile_salida}", file=sys.stderr)
+            estadisticas.sort_stats("cumulative").print_stats(25)
+
+def guardar_metricas(args, codigo):
+    """Escribe el JSON de métricas si algún módulo de trabajo llegó a cargarse."""
+    if "metricas" not in sys.modules:
+        return
+    try:
+        ruta = sys.modules["metricas"].guardar_metricas(args.metricas, comando=args.comando,
+                                                        entrada=args.entrada, codigo_salida=codigo)
+        print(f"Métricas guardadas en {ruta}", file=sys.stderr)
+    except OSError as e:
+        print(f"No se pudieron guardar las métricas: {e}", file=sys.stderr)
+
+def main_no_interactivo(args):
+    """Ejecuta un subcomando sin animaciones ni pausas y retorna el código de salida."""
+    codigo = ERROR
+    marcar_listo()
+    try:
+        if perfilando(args):
+            resultado = ejecutar_con_perfil(args.funcion, args)
+        else:
+            resultado = args.funcion(args)
+        codigo = EXITO if resultado else ERROR
+    except KeyboardInterrupt:
+        codigo = INTERRUMPIDO
+    except Exception as e:
+        print(f"Error inesperado: {str(e)}", file=sys.stderr)
+    guardar_metricas(args, codigo)
+    return codigo
+
 def main():
     animacion_bienvenida()
     eleccion()
 
+INICIO_LISTO = None
+
 if __name__ == "__main__":
+    # Se registra antes de parse_args: con --help argparse termina con sys.exit dentro del parseo
+    if "--tiempos-importacion" in sys.argv[1:]:
+        import atexit
+        atexit.register(reporte_tiempos_importacion)
+    argumentos = crear_parser().parse_args()
+    if argumentos.comando:
+        sys.exit(main_no_interactivo(argumentos))
     try:
         main()
     except KeyboardInterrupt:
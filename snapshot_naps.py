@@ -0,0 +1,154 @@
+import logging
+import os
+import sqlite3
+import time
+
+from psycopg2 import sql
+
+import metricas
+from base_datos import conexion_bd, leer_configuracion
+
+RUTA_SNAPSHOT = os.path.join("data", ".cache", "inv_naps.sqlite")
+
+# Columna de inv_naps usada como marca de agua para traer solo las filas nuevas
+# (se puede cambiar en la sección "Snapshot" de conexion.json)
+COLUMNA_MARCA = "fecha_de_liberacion"
+TAMANO_LOTE_SNAPSHOT = 5000
+
+
+def columna_marca():
+    return leer_configuracion().get("Snapshot", {}).get("columna_marca", COLUMNA_MARCA)
+
+
+def abrir_snapshot(ruta=RUTA_SNAPSHOT):
+    """Abre (y crea si no existe) la base SQLite local con la copia de inv_naps"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS naps (nap TEXT PRIMARY KEY, cluster TEXT, region TEXT, zona TEXT)"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_naps_cluster ON naps (cluster)")
+    conexion.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+    return conexion
+
+
+def _leer_meta(conexion, clave):
+    fila = conexion.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else None
+
+
+def _guardar_meta(conexion, clave, valor):
+    conexion.execute(
+        "INSERT INTO meta (clave, valor) VALUES (?, ?) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+        (clave, valor),
+    )
+
+
+def existe_snapshot(ruta=RUTA_SNAPSHOT):
+    """Indica si ya se sincronizó al menos una vez"""
+    if not os.path.exists(ruta):
+        return False
+    conexion = abrir_snapshot(ruta)
+    try:
+        return _leer_meta(conexion, "ultima_sincronizacion") is not None
+    finally:
+        conexion.close()
+
+
+def sincronizar_snapshot(completo=False, ruta=RUTA_SNAPSHOT):
+    """Trae de inv_naps solo las filas con marca mayor o igual a la última sincronizada.
+    Con completo=True se reconstruye la copia (necesario para reflejar NAPs eliminados).
+    Retorna False si no se pudo sincronizar; la copia anterior sigue siendo utilizable."""
+    conn = conexion_bd()
+    if conn is None:
+        logging.warning("No se pudo sincronizar el snapshot de inv_naps; se usará la copia local")
+        return False
+
+    local = abrir_snapshot(ruta)
+    cursor = None
+    inicio = time.perf_counter()
+    try:
+        marca = None if completo else _leer_meta(local, "marca")
+        columna = sql.Identifier(columna_marca())
+        consulta = sql.SQL("SELECT nap, cluster, region, zona, {} FROM inv_naps").format(columna)
+        parametros = None
+        if marca is not None:
+            # Se usa >= para no perder filas con la misma marca cargadas después de la última sincronización
+            consulta += sql.SQL(" WHERE {} >= %s").format(columna)
+            parametros = (marca,)
+
+        cursor = conn.cursor(name="snapshot_inv_naps")
+        cursor.itersize = TAMANO_LOTE_SNAPSHOT
+        cursor.execute(consulta, parametros)
+
+        if completo:
+            local.execute("DELETE FROM naps")
+        # Todas las filas traídas tienen marca >= la anterior, así que su máximo es la nueva marca
+        maximo = None
+        total = 0
+        while True:
+            filas = cursor.fetchmany(TAMANO_LOTE_SNAPSHOT)
+            if not filas:
+                break
+            local.executemany(
+                "INSERT INTO naps (nap, cluster, region, zona) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (nap) DO UPDATE SET cluster = excluded.cluster, "
+                "region = excluded.region, zona = excluded.zona",
+                [(str(fila[0]), fila[1], fila[2], fila[3]) for fila in filas],
+            )
+            for fila in filas:
+                if fila[4] is not None and (maximo is None or fila[4] > maximo):
+                    maximo = fila[4]
+            total += len(filas)
+
+        if maximo is not None:
+            _guardar_meta(local, "marca", str(maximo))
+        _guardar_meta(local, "ultima_sincronizacion", time.strftime("%Y-%m-%d %H:%M:%S"))
+        local.commit()
+        metricas.registrar("sincronizar_snapshot", metricas.CONSULTA, time.perf_counter() - inicio, filas=total)
+        logging.info(f"Snapshot de inv_naps sincronizado: {total} filas nuevas o actualizadas")
+        return True
+    except Exception as e:
+        local.rollback()
+        logging.error(f"Error al sincronizar el snapshot de inv_naps: {e}")
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+        local.close()
+
+
+def naps_faltantes(codigos_nap, ruta=RUTA_SNAPSHOT):
+    """Retorna los códigos (con su valor original) que no están en la copia local de inv_naps"""
+    originales = {str(codigo): codigo for codigo in codigos_nap}
+    conexion = abrir_snapshot(ruta)
+    try:
+        conexion.execute("CREATE TEMP TABLE codigos_excel (nap TEXT PRIMARY KEY)")
+        conexion.executemany("INSERT OR IGNORE INTO codigos_excel (nap) VALUES (?)",
+                             ((codigo,) for codigo in originales))
+        faltantes = conexion.execute(
+            "SELECT e.nap FROM codigos_excel e WHERE NOT EXISTS (SELECT 1 FROM naps n WHERE n.nap = e.nap)"
+        ).fetchall()
+    finally:
+        conexion.close()
+    logging.info(f"{len(originales)} códigos NAP verificados contra el snapshot, {len(faltantes)} faltantes")
+    return {originales[fila[0]] for fila in faltantes}
+
+
+def regiones_zonas(clusters, ruta=RUTA_SNAPSHOT):
+    """Retorna {cluster: (region, zona)} de los clusters presentes en la copia local"""
+    conexion = abrir_snapshot(ruta)
+    try:
+        resultado = {}
+        for cluster in clusters:
+            fila = conexion.execute(
+                "SELECT region, zona FROM naps WHERE cluster = ? LIMIT 1", (str(cluster),)
+            ).fetchone()
+            if fila:
+                resultado[str(cluster)] = fila
+        return resultado
+    finally:
+        conexion.close()
@@ -0,0 +1,206 @@
+"""Modo vigilancia: procesa cada libro nuevo o modificado de una carpeta apenas termina de copiarse."""
+import logging
+import os
+import signal
+import threading
+import time
+import zipfile
+
+import lector_excel
+import metricas
+import procesamiento_libros
+import snapshot_naps
+from base_datos import conexion_bd
+
+INTERVALO_SONDEO = 2.0       # segundos entre revisiones de la carpeta cuando no hay inotify
+ESPERA_ESTABLE = 3.0         # segundos sin cambios de tamaño ni fecha antes de procesar un libro
+INTERVALO_SEGURIDAD = 60.0   # con inotify, revisión completa periódica por si se perdió un evento
+REINTENTO_INICIAL = 30.0     # segundos antes de reintentar un libro que falló; se duplica en cada fallo
+REINTENTO_MAXIMO = 300.0
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_DISPONIBLE = True
+except ImportError:
+    WATCHDOG_DISPONIBLE = False
+
+
+def firma(ruta):
+    """(tamaño, fecha de modificación) del archivo, o None si ya no existe"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+
+def firmas_libros(directorio):
+    firmas = {}
+    for ruta in procesamiento_libros.buscar_libros(directorio):
+        actual = firma(ruta)
+        if actual is not None:
+            firmas[ruta] = actual
+    return firmas
+
+
+def libro_completo(ruta):
+    """Un .xlsx es un zip con el índice al final: si se puede leer, la copia terminó"""
+    try:
+        return zipfile.is_zipfile(ruta)
+    except OSError:
+        return False
+
+
+if WATCHDOG_DISPONIBLE:
+    class _AvisoCambios(FileSystemEventHandler):
+        """Despierta al vigilante con cualquier evento de la carpeta; el filtrado lo hace revisar()"""
+
+        def __init__(self, evento):
+            super().__init__()
+            self.evento = evento
+
+        def on_any_event(self, evento):
+            self.evento.set()
+
+
+class Vigilante:
+    """Vigila una carpeta y ejecuta la liberación y la validación de NAPs de cada libro nuevo o modificado.
+    Todo ocurre en el mismo proceso: los módulos, el pool de conexiones y las cachés quedan cargados
+    entre un libro y otro. Usa inotify (paquete watchdog) si está instalado y si no revisa la carpeta
+    cada 'intervalo' segundos."""
+
+    def __init__(self, directorio, opciones, espera_estable=ESPERA_ESTABLE, intervalo=INTERVALO_SONDEO,
+                 procesar_existentes=False, sondeo=False, metricas_por_libro=False):
+        self.directorio = directorio
+        self.opciones = opciones
+        self.espera_estable = espera_estable
+        self.intervalo = intervalo
+        self.usar_inotify = WATCHDOG_DISPONIBLE and not sondeo
+        self.metricas_por_libro = metricas_por_libro
+        # Firma con la que se procesó (o descartó) cada libro: {ruta: firma}
+        self.procesados = {} if procesar_existentes else firmas_libros(directorio)
+        # Libros con cambios aún no procesados: {ruta: (firma, instante desde el que no cambia)}
+        self.pendientes = {}
+        # Libros que fallaron: {ruta: (firma, intentos, instante del próximo intento)}
+        self.reintentos = {}
+        self.resultados = []
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+
+    def detener(self, *_):
+        self._detener.set()
+        self._evento.set()
+
+    def revisar(self):
+        """Actualiza los pendientes y retorna los libros cuya firma no cambió durante espera_estable"""
+        ahora = time.monotonic()
+        actuales = firmas_libros(self.directorio)
+        for pendientes in (self.pendientes, self.reintentos):
+            for ruta in list(pendientes):
+                if ruta not in actuales:
+                    del pendientes[ruta]
+
+        listos = []
+        for ruta, actual in actuales.items():
+            if self.procesados.get(ruta) == actual:
+                self.pendientes.pop(ruta, None)
+                continue
+            reintento = self.reintentos.get(ruta)
+            if reintento is not None:
+                if reintento[0] == actual:
+                    # Falló con este mismo contenido: ya está completo, solo se espera el próximo intento
+                    if ahora >= reintento[2]:
+                        listos.append((ruta, actual))
+                    continue
+                # Cambió después del fallo: se trata como un libro nuevo
+                del self.reintentos[ruta]
+            anterior = self.pendientes.get(ruta)
+            if anterior is None or anterior[0] != actual:
+                # Nuevo o todavía copiándose: se vuelve a contar la espera
+                self.pendientes[ruta] = (actual, ahora)
+            elif ahora - anterior[1] >= self.espera_estable:
+                del self.pendientes[ruta]
+                if libro_completo(ruta):
+                    listos.append((ruta, actual))
+                else:
+                    logging.warning(f"{ruta} no es un libro válido; se ignorará hasta que vuelva a cambiar")
+                    self.procesados[ruta] = actual
+        return listos
+
+    def procesar(self, ruta, firma_libro):
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        print(f"Procesando {ruta}...")
+        if self.opciones.get("snapshot"):
+            snapshot_naps.sincronizar_snapshot()
+        resultado = procesamiento_libros.procesar_libro(ruta, nombre, self.opciones)
+        resultado.pop("metricas")
+        # Si el libro cambió mientras se procesaba, la próxima revisión verá otra firma y lo repetirá
+        if resultado["liberacion"] and resultado["naps"]:
+            self.procesados[ruta] = firma_libro
+            self.reintentos.pop(ruta, None)
+        else:
+            intentos = self.reintentos.get(ruta, (None, 0))[1] + 1
+            espera = min(REINTENTO_INICIAL * 2 ** (intentos - 1), REINTENTO_MAXIMO)
+            self.reintentos[ruta] = (firma_libro, intentos, time.monotonic() + espera)
+            logging.warning(f"{ruta} falló (intento {intentos}); se reintentará en {espera:.0f} s")
+        self.resultados.append(resultado)
+
+        if self.metricas_por_libro:
+            os.makedirs(metricas.DIR_METRICAS, exist_ok=True)
+            destino = os.path.join(metricas.DIR_METRICAS, f"metricas_{nombre}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            try:
+                metricas.guardar_metricas(destino, comando="vigilar", entrada=ruta)
+            except OSError as e:
+                logging.warning(f"No se pudieron guardar las métricas de {ruta}: {e}")
+        # Las hojas de este libro no se volverán a leer sin cambios: no se conservan en memoria
+        lector_excel.limpiar_cache_memoria()
+
+        liberacion_ok = "OK" if resultado["liberacion"] else "ERROR"
+        naps_ok = "OK" if resultado["naps"] else "ERROR"
+        print(f"  {nombre}: liberación {liberacion_ok}, NAPs {naps_ok} ({resultado['segundos']:.2f} s)")
+        return resultado
+
+    def ejecutar(self):
+        """Vigila la carpeta hasta Ctrl+C o SIGTERM. Retorna True al detenerse."""
+        if not os.path.isdir(self.directorio):
+            logging.error(f"La carpeta {self.directorio} no existe")
+            return False
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.detener)
+
+        # Abrir la primera conexión ahora para que el primer libro no pague el handshake
+        conn = conexion_bd()
+        if conn is not None:
+            conn.close()
+
+        observador = None
+        if self.usar_inotify:
+            observador = Observer()
+            observador.schedule(_AvisoCambios(self._evento), self.directorio, recursive=False)
+            observador.start()
+        print(f"Vigilando {self.directorio} ({'inotify' if observador else 'sondeo'}); Ctrl+C para detener")
+
+        try:
+            while not self._detener.is_set():
+                for ruta, firma_libro in self.revisar():
+                    if self._detener.is_set():
+                        break
+                    self.procesar(ruta, firma_libro)
+                if self.pendientes:
+                    # Hay libros copiándose: volver a mirar cuando pueda haberse cumplido la espera
+                    espera = min(self.espera_estable, self.intervalo)
+                else:
+                    espera = INTERVALO_SEGURIDAD if observador else self.intervalo
+                if self.reintentos:
+                    # Despertar a tiempo para el próximo reintento aunque la carpeta no cambie
+                    proximo = min(reintento[2] for reintento in self.reintentos.values())
+                    espera = min(espera, max(proximo - time.monotonic(), 0.0))
+                self._evento.wait(espera)
+                self._evento.clear()
+        finally:
+            if observador:
+                observador.stop()
+                observador.join()
+        print(f"Vigilancia detenida: {len(self.resultados)} libros procesados")
+        return True